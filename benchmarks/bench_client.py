@@ -0,0 +1,165 @@
+"""Throughput and peak memory of Client calls against a local fake server (see fakeserver.py),
+written as json so results can be compared between releases.
+
+Usage:
+    python benchmarks/bench_client.py [--annotations N] [--tasks N] [--chips N] [--chip-size PX]
+                                      [--json json|orjson] [--compress gzip|zstd] [--gzip-responses]
+                                      [--output results.json] [--baseline previous.json] [--tolerance 0.2]
+
+The fake server runs in a separate process, so peak memory is the client's alone. Bytes are as sent over the wire.
+With --baseline, benchmarks more than tolerance slower than the baseline are reported and the exit code is 1,
+byte and cpu ratios are printed as well, e.g. to see the savings from --json orjson --compress gzip --gzip-responses:
+
+    python benchmarks/bench_client.py --json json --output plain.json
+    python benchmarks/bench_client.py --json orjson --compress gzip --gzip-responses --baseline plain.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict
+
+import projectkiwi3
+from projectkiwi3.models import AnnotationPayload
+from projectkiwi3.codec import JsonCodec
+
+
+def startServer(args: argparse.Namespace) -> subprocess.Popen:
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(__file__), "fakeserver.py"),
+                               "--annotations", str(args.annotations), 
+                               "--tasks", str(args.tasks), 
+                               "--chip-size", str(args.chip_size)] + (["--gzip"] if args.gzip_responses else []), 
+                              stdout=subprocess.PIPE, text=True)
+    server.url = server.stdout.readline().strip()
+    return server
+
+
+def traffic(client: projectkiwi3.Client) -> Dict[str, int]:
+    endpoints = client.metrics.snapshot()['endpoints'].values()
+    return {name: sum(endpoint.get(name, 0) for endpoint in endpoints) for name in ("requests", "requestBytes", "responseBytes")}
+
+
+def measure(client: projectkiwi3.Client, fn: Callable[[], any], n: int, repeat: int) -> Dict[str, float]:
+    """Best of repeat runs for throughput and cpu time, then one run under tracemalloc for peak memory
+    """
+    elapsed = cpu = float("inf")
+    before = traffic(client)
+    for _ in range(repeat):
+        start, startCpu = time.perf_counter(), time.process_time()
+        result = fn()
+        elapsed = min(elapsed, time.perf_counter() - start)
+        cpu = min(cpu, time.process_time() - startCpu)
+        del result
+    after = traffic(client)
+
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {'items': n, 'seconds': elapsed, 'itemsPerSecond': n / elapsed, 'cpuSeconds': cpu, 'peakMiB': peak / 1024**2,
+            **{name: (after[name] - before[name]) / repeat for name in after}}
+
+
+def run(args: argparse.Namespace, url: str) -> Dict[str, dict]:
+    client = projectkiwi3.Client("bench", url, part_url=f"{url}/v3/get_part", pool_maxsize=args.workers,
+                                 json_codec=JsonCodec.orjson() if args.json == "orjson" else JsonCodec.stdlib(),
+                                 compress_requests=args.compress)
+    queue = client.getLabelingQueue(1, trusted=True)
+    tasks = queue.labelingTasks[:args.chips]
+    payloads = [AnnotationPayload(coordinates=[[-123.4 + i * 1e-4, 56.7], [-123.4, 56.7 + 1e-4], [-123.4 + i * 1e-4, 56.7]],
+                                  shape="Polygon", labelId=i % 5, confidence=0.9) for i in range(args.uploads)]
+
+    benchmarks = {
+        "getAnnotations": (lambda: client.getAnnotations(1), args.annotations),
+        "getAnnotations(trusted)": (lambda: client.getAnnotations(1, trusted=True), args.annotations),
+        "iterAnnotations(trusted)": (lambda: sum(1 for _ in client.iterAnnotations(1, trusted=True)), args.annotations),
+        "getAnnotationTable": (lambda: client.getAnnotationTable(1), args.annotations),
+        "getLabelingQueue": (lambda: client.getLabelingQueue(1), args.tasks),
+        "getLabelingQueue(trusted)": (lambda: client.getLabelingQueue(1, trusted=True), args.tasks),
+        "addAnnotations": (lambda: client.addAnnotations(1, payloads), args.uploads),
+        "getImageForTask": (lambda: [client.getImageForTask(1, task.coordinates, max_size=args.chip_size) for task in tasks], 
+                            len(tasks)),
+        "getImagesForTasks": (lambda: list(client.getImagesForTasks(1, tasks, max_size=args.chip_size, max_workers=args.workers)), 
+                              len(tasks)),
+    }
+    results = {}
+    for name, (fn, n) in benchmarks.items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = result = measure(client, fn, n, args.repeat)
+        print(f"{name:28s} {result['itemsPerSecond']:12.0f} items/s {result['cpuSeconds']:8.2f} cpu s "
+              f"{result['peakMiB']:8.1f} MiB peak {(result['requestBytes'] + result['responseBytes']) / 1024**2:8.1f} MiB sent+received", 
+              flush=True)
+    client.close()
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: dict, tolerance: float) -> bool:
+    """Print the change from the baseline, returns False if anything regressed
+    """
+    ok = True
+    for name, result in results.items():
+        if name not in baseline['results']:
+            continue
+        previous = baseline['results'][name]
+        speed = result['itemsPerSecond'] / previous['itemsPerSecond']
+        memory = result['peakMiB'] / max(previous['peakMiB'], 1e-6)
+        cpu = result['cpuSeconds'] / max(previous.get('cpuSeconds', 0), 1e-6)
+        transferred = (result['requestBytes'] + result['responseBytes']) / max(previous.get('requestBytes', 0) + previous.get('responseBytes', 0), 1)
+        regressed = speed < 1 - tolerance or memory > 1 + tolerance
+        ok = ok and not regressed
+        print(f"{name:28s} {speed:6.2f}x throughput {cpu:6.2f}x cpu {memory:6.2f}x memory {transferred:6.2f}x bytes "
+              f"{'REGRESSED' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--annotations", type=int, default=100000)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--uploads", type=int, default=5000, help="annotations per addAnnotations call")
+    parser.add_argument("--chips", type=int, default=200, help="images per getImageForTask benchmark")
+    parser.add_argument("--chip-size", type=int, default=512)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", choices=["json", "orjson"], default="json", help="json codec")
+    parser.add_argument("--compress", choices=["gzip", "zstd"], help="compress request bodies")
+    parser.add_argument("--gzip-responses", action="store_true", help="server gzips json responses")
+    parser.add_argument("--only", nargs="*", help="run only these benchmarks")
+    parser.add_argument("--output", help="write results to this json file")
+    parser.add_argument("--baseline", help="compare with results from a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = startServer(args)
+    try:
+        results = run(args, server.url)
+    finally:
+        server.terminate()
+        server.wait()
+
+    report = {
+        'version': projectkiwi3.__version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'date': datetime.now(timezone.utc).isoformat(),
+        'parameters': {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "tolerance")},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            if not compare(results, json.load(f), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
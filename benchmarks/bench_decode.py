@@ -0,0 +1,74 @@
+"""Decode throughput and peak memory for annotations and labeling queues on synthetic payloads,
+comparing validated models, trusted records and AnnotationTable.
+
+Usage:
+    python benchmarks/bench_decode.py [n_annotations]
+"""
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+from projectkiwi3.models import Annotation, Label, LabelingQueue, AnnotationRecord, LabelRecord, LabelingQueueRecord, LabelRegistry
+from projectkiwi3.table import AnnotationTable
+
+
+def annotationPayload(n: int, vertices: int = 8) -> list:
+    return [{
+        "id": i, "sub": "google-oauth2|1234", "shape": "Polygon", "createdAt": "2024-09-05T18:47:17.529Z",
+        "confidence": 0.9, "labelId": i % 5, "modifiedAt": "2024-09-05T18:47:17.529Z",
+        "label": {"id": i % 5, "name": f"label {i % 5}", "color": "rgb(3, 186, 252)", "active": True, 
+                  "modifiedAt": "2024-07-15T20:29:59.697Z"},
+        "coordinates": [{"lng": -123.4 + j * 1e-4, "lat": 56.7 + j * 1e-4} for j in range(vertices)]
+    } for i in range(n)]
+
+
+def queuePayload(n: int) -> dict:
+    return {
+        "id": 1, "name": "queue", "createdBy": "me", "modifiedAt": "2024-09-05T18:47:17.529Z",
+        "labelingTasks": [{
+            "id": i, "complete": False, "completedBy": None,
+            "taskCoordinates": [{"lng": -123.4 + j * 1e-3, "lat": 56.7} for j in range(5)]
+        } for i in range(n)]
+    }
+
+
+def measure(name: str, fn: Callable, n: int, repeat: int = 3):
+    # time without tracing, tracemalloc slows allocation heavy code unevenly
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = min(elapsed, time.perf_counter() - start)
+        del result
+
+    tracemalloc.start()
+    result = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(f"{name:45s} {n / elapsed:12.0f} objects/s {peak / 1024**2:10.1f} MiB peak")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    annotations = annotationPayload(n)
+    queue = queuePayload(n)
+
+    def decode(model: type, registry: Callable[[], LabelRegistry] = lambda: None):
+        labels = registry()
+        return [model.from_dict(a, labels) for a in annotations]
+    known = [Label.from_dict(a["label"]) for a in annotations[:5]]
+
+    measure("Annotation.from_dict", lambda: decode(Annotation), n)
+    measure("Annotation.from_dict + LabelRegistry", lambda: decode(Annotation, LabelRegistry), n)
+    measure("Annotation.from_dict + known labels", lambda: decode(Annotation, lambda: LabelRegistry(Label, known)), n)
+    measure("AnnotationRecord.from_dict", lambda: decode(AnnotationRecord), n)
+    measure("AnnotationRecord.from_dict + LabelRegistry", lambda: decode(AnnotationRecord, lambda: LabelRegistry(LabelRecord)), n)
+    measure("AnnotationTable.from_json", lambda: AnnotationTable.from_json(annotations), n)
+    measure("LabelingQueue.from_dict", lambda: LabelingQueue.from_dict(queue), n)
+    measure("LabelingQueueRecord.from_dict", lambda: LabelingQueueRecord.from_dict(queue), n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Requests/sec for Client.get against a local stub server, with and without the pooled session.
+
+Usage:
+    python benchmarks/bench_pool.py [n_requests] [n_threads]
+"""
+import sys
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+import projectkiwi3
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = json.dumps([{"id": 1, "name": "stub"}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def startServer() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(fn, n: int, threads: int) -> float:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(lambda _: fn(), range(n)))
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    server = startServer()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    client = projectkiwi3.Client("bench", url, pool_maxsize=threads)
+
+    def unpooled():
+        resp = requests.get(f"{url}/api/project", headers={'x-api-key': "bench"})
+        resp.raise_for_status()
+        return resp.json()
+
+    def pooled():
+        return client.get(f"{url}/api/project")
+
+    before = run(unpooled, n, threads)
+    after = run(pooled, n, threads)
+    print(f"requests.get (new connection per call): {before:8.1f} req/s")
+    print(f"Client.get   (pooled keep-alive):       {after:8.1f} req/s")
+    print(f"speedup: {after / before:.2f}x")
+
+    client.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Boxes/sec converting detector output to lng/lat polygons, per box vs vectorized.
+
+Usage:
+    python benchmarks/bench_utils.py [n_boxes]
+"""
+import sys
+import time
+import numpy as np
+from projectkiwi3 import utils
+
+
+TASK = [[-123.40, 56.70], [-123.40, 56.71], [-123.38, 56.71], [-123.38, 56.70], [-123.40, 56.70]]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = np.random.default_rng(0)
+    boxes = rng.uniform(0, 1024, size=(n, 4))
+
+    start = time.perf_counter()
+    perBox = [utils.boxToLngLatPolygon(box, 1024, 1024, TASK, padding_factor=0.2) for box in boxes.tolist()]
+    perBoxTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = utils.boxesToLngLatPolygons(boxes, 1024, 1024, TASK, padding_factor=0.2)
+    batchTime = time.perf_counter() - start
+
+    assert np.allclose(np.array(perBox), batch)
+    print(f"boxToLngLatPolygon per box:  {n / perBoxTime:12.0f} boxes/s")
+    print(f"boxesToLngLatPolygons batch: {n / batchTime:12.0f} boxes/s")
+    print(f"speedup: {perBoxTime / batchTime:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
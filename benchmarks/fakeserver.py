@@ -0,0 +1,167 @@
+"""Local stand-in for the projectkiwi api and get_part service, serving a synthetic project at a configurable scale.
+
+Usage:
+    python benchmarks/fakeserver.py [--annotations N] [--tasks N] [--chip-size PX] [--port PORT] [--gzip]
+
+Prints the url once listening. Routes:
+    GET  /api/project, /api/project/1, /api/project/1/labels, /api/project/1/annotations,
+         /api/project/1/labelingQueue, /api/labelingQueue/1, /api/imagery/1, /api/imagery/1/download_url
+    POST /api/project/1/annotations/multiple (echoes the created annotations)
+    POST /v3/get_part (a base64 png of chip-size x chip-size)
+
+gzip request bodies are accepted, with --gzip json responses are gzipped for clients that accept it.
+"""
+import io
+import sys
+import gzip
+import json
+import base64
+import argparse
+import threading
+from typing import Tuple
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+from PIL import Image
+
+from bench_decode import annotationPayload, queuePayload
+
+
+TIMESTAMP = "2024-09-05T18:47:17.529Z"
+LABELS = [{"id": i, "name": f"label {i}", "color": "rgb(3, 186, 252)", "active": True, "modifiedAt": TIMESTAMP} 
+          for i in range(5)]
+
+
+def chipPayload(size: int, seed: int = 0) -> bytes:
+    """Noise compresses poorly, so the png is about as large as real imagery
+    """
+    rng = np.random.default_rng(seed)
+    array = rng.integers(0, 255, (size, size, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format="PNG")
+    return base64.encodebytes(buffer.getvalue())
+
+
+class FakeKiwi():
+
+    def __init__(self, annotations: int = 100000, tasks: int = 10000, chip_size: int = 512, gzip_responses: bool = False):
+        """Synthetic project 1 with imagery layer 1 and labeling queue 1, responses are serialized once up front
+        so the server is not the bottleneck.
+
+        Args:
+            annotations (int, optional): Annotations in the project. Defaults to 100000.
+            tasks (int, optional): Tasks in the labeling queue. Defaults to 10000.
+            chip_size (int, optional): Width and height of get_part images. Defaults to 512.
+            gzip_responses (bool, optional): gzip json responses if the client accepts it. Defaults to False.
+        """
+        project = {"id": 1, "name": "bench", "createdAt": TIMESTAMP, "modifiedAt": TIMESTAMP, "owner": "me"}
+        imagery = {"id": 1, "sub": "me", "name": "layer", "createdAt": TIMESTAMP, "ready": True, "error": False,
+                   "storageSizeKB": 1024, "modifiedAt": TIMESTAMP}
+        queue = queuePayload(tasks)
+        self.static = {
+            "GET /api/project": [project],
+            "GET /api/project/1": project,
+            "GET /api/project/1/labels": LABELS,
+            "GET /api/project/1/annotations": annotationPayload(annotations),
+            "GET /api/project/1/labelingQueue": [queue],
+            "GET /api/labelingQueue/1": queue,
+            "GET /api/imagery/1": imagery,
+            "GET /api/project/1/imagery": [imagery],
+            "GET /api/imagery/1/download_url": "https://example.com/1.tif",
+        }
+        self.static = {route: json.dumps(body).encode() for route, body in self.static.items()}
+        self.gzipped = {route: gzip.compress(body, 6) for route, body in self.static.items()} if gzip_responses else {}
+        self.chips = [chipPayload(chip_size, seed) for seed in range(4)]
+        self.nextId = 10**9
+        self.lock = threading.Lock()
+
+    def created(self, body: bytes) -> bytes:
+        payloads = json.loads(body)
+        with self.lock:
+            first, self.nextId = self.nextId, self.nextId + len(payloads)
+        return json.dumps([{
+            "id": first + i, "sub": "me", "shape": payload["shape"], "createdAt": TIMESTAMP,
+            "confidence": payload.get("confidence", 1.0), "labelId": payload["labelId"], "modifiedAt": TIMESTAMP,
+            "label": LABELS[payload["labelId"] % len(LABELS)],
+            "coordinates": [{"lng": lng, "lat": lat} for lng, lat in payload["coordinates"]]
+        } for i, payload in enumerate(payloads)]).encode()
+
+    def respond(self, method: str, path: str, body: bytes, acceptGzip: bool = False) -> Tuple[bytes, bool]:
+        """Returns (response body or None if not found, whether it is gzipped)
+        """
+        route = f"{method} {path}"
+        if acceptGzip and route in self.gzipped:
+            return self.gzipped[route], True
+        if route in self.static:
+            return self.static[route], False
+        if route == "POST /api/project/1/annotations/multiple":
+            return self.created(body), False
+        if route == "POST /v3/get_part":
+            return self.chips[len(body) % len(self.chips)], False
+        return None, False
+
+    def serve(self, port: int = 0) -> ThreadingHTTPServer:
+        """Start serving on a background thread.
+
+        Args:
+            port (int, optional): Port to listen on, 0 picks a free port. Defaults to 0.
+
+        Returns:
+            ThreadingHTTPServer: the server, shutdown() to stop
+        """
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive
+            disable_nagle_algorithm = True
+
+            def handle_one(self, method: str):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                payload, gzipped = fake.respond(method, self.path, body, "gzip" in self.headers.get("Accept-Encoding", ""))
+                status = 200 if payload is not None else 404
+                payload = b'{"error": "not found"}' if payload is None else payload
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                if gzipped:
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self.handle_one("GET")
+
+            def do_POST(self):
+                self.handle_one("POST")
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--annotations", type=int, default=100000)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--chip-size", type=int, default=512)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--gzip", action="store_true", help="gzip json responses")
+    args = parser.parse_args()
+
+    server = FakeKiwi(args.annotations, args.tasks, args.chip_size, args.gzip).serve(args.port)
+    print(f"http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+from __future__ import annotations
+import asyncio
+import functools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Callable, AsyncIterator, Tuple, Union, TYPE_CHECKING
+
+from projectkiwi3.Client import Client
+from projectkiwi3.models import Project, Annotation, Label, LabelingQueue, LabelingTask, Imagery, AnnotationPayload, LabelingQueueRecord, UploadResult
+from projectkiwi3.models import AnnotationRecord, LabelRecord
+
+if TYPE_CHECKING:
+    import numpy as np
+    from projectkiwi3.table import AnnotationTable
+    from projectkiwi3.index import AnnotationIndex
+    from projectkiwi3.geo import TaskGeoTransform
+    from projectkiwi3.tiles import Tile
+    from projectkiwi3.stack import ImageStack
+
+
+class AsyncClient():
+
+    def __init__(self, key: str, url: str = "https://projectkiwi.io", max_concurrency: int = 64, **kwargs):
+        """constructor
+
+        Every method of Client is available as a coroutine. Requests run on a bounded pool of worker threads
+        sharing one keep-alive connection pool, so the event loop is never blocked.
+
+        Args:
+            key (str): API key.
+            url (str, optional): url for api, mostly used for development. Defaults to "https://projectkiwi.io".
+            max_concurrency (int, optional): Maximum number of requests in flight at once. Defaults to 64.
+            **kwargs: Passed through to Client e.g. max_retries, timeout.
+        """
+        kwargs.setdefault("pool_maxsize", max_concurrency)
+        self.client = Client(key, url, **kwargs)
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="projectkiwi3")
+
+    async def _run(self, fn: Callable, *args, **kwargs) -> any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def close(self):
+        """Wait for in-flight requests and close all pooled connections.
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def get(self, url: str) -> any:
+        """See Client.get"""
+        return await self._run(self.client.get, url)
+
+    async def post(self, url: str, json: dict) -> any:
+        """See Client.post"""
+        return await self._run(self.client.post, url, json)
+
+    async def getProject(self, projectId: int) -> Project:
+        """See Client.getProject"""
+        return await self._run(self.client.getProject, projectId)
+
+    async def getProjects(self) -> List[Project]:
+        """See Client.getProjects"""
+        return await self._run(self.client.getProjects)
+
+    async def getLabels(self, projectId: int, trusted: bool = False) -> List[Union[Label, LabelRecord]]:
+        """See Client.getLabels"""
+        return await self._run(self.client.getLabels, projectId, trusted=trusted)
+
+    async def getAnnotations(self, projectId: int, trusted: bool = False, labels: List[Label] = None) -> List[Union[Annotation, AnnotationRecord]]:
+        """See Client.getAnnotations"""
+        return await self._run(self.client.getAnnotations, projectId, trusted=trusted, labels=labels)
+
+    async def iterAnnotations(self, projectId: int, batch_size: int = None, trusted: bool = False, labels: List[Label] = None) -> AsyncIterator[Union[Annotation, AnnotationRecord, List[Union[Annotation, AnnotationRecord]]]]:
+        """See Client.iterAnnotations"""
+        annotations = self.client.iterAnnotations(projectId, batch_size=batch_size, trusted=trusted, labels=labels)
+        done = object()
+        try:
+            while True:
+                item = await self._run(next, annotations, done)
+                if item is done:
+                    return
+                yield item
+        finally:
+            annotations.close()
+
+    async def getAnnotationTable(self, projectId: int) -> AnnotationTable:
+        """See Client.getAnnotationTable"""
+        return await self._run(self.client.getAnnotationTable, projectId)
+
+    async def getAnnotationIndex(self, projectId: int, labelIds: List[int] = None) -> AnnotationIndex:
+        """See Client.getAnnotationIndex"""
+        return await self._run(self.client.getAnnotationIndex, projectId, labelIds)
+
+    async def getLabelingQueues(self, projectId: int, trusted: bool = False) -> List[Union[LabelingQueue, LabelingQueueRecord]]:
+        """See Client.getLabelingQueues"""
+        return await self._run(self.client.getLabelingQueues, projectId, trusted=trusted)
+
+    async def getLabelingQueue(self, id: int, trusted: bool = False) -> Union[LabelingQueue, LabelingQueueRecord]:
+        """See Client.getLabelingQueue"""
+        return await self._run(self.client.getLabelingQueue, id, trusted=trusted)
+
+    async def getAllImagery(self, projectId: int) -> List[Imagery]:
+        """See Client.getAllImagery"""
+        return await self._run(self.client.getAllImagery, projectId)
+
+    async def getImagery(self, imageryId: int) -> Imagery:
+        """See Client.getImagery"""
+        return await self._run(self.client.getImagery, imageryId)
+
+    async def getImageryUrl(self, imageryId: int, stale: str = None) -> str:
+        """See Client.getImageryUrl"""
+        return await self._run(self.client.getImageryUrl, imageryId, stale)
+
+    async def getImageForTask(self, imageryId: int, 
+                              coordinates: List[List[float]], 
+                              max_size: int = 1024, 
+                              padding_factor: float = None,
+                              out: np.ndarray = None,
+                              encoded: bool = False) -> Union[np.array, bytes]:
+        """See Client.getImageForTask"""
+        return await self._run(self.client.getImageForTask, imageryId, coordinates, max_size=max_size, 
+                               padding_factor=padding_factor, out=out, encoded=encoded)
+
+    async def getImagesForTasks(self, imageryId: int, 
+                                tasks: Union[List[LabelingTask], LabelingQueue], 
+                                max_size: int = 1024, 
+                                padding_factor: float = None,
+                                ordered: bool = True,
+                                return_exceptions: bool = True) -> AsyncIterator[Tuple[LabelingTask, Union[np.array, Exception]]]:
+        """See Client.getImagesForTasks, concurrency is bounded by max_concurrency."""
+        if isinstance(tasks, (LabelingQueue, LabelingQueueRecord)):
+            tasks = tasks.labelingTasks
+        await self.getImageryUrl(imageryId)
+
+        async def fetch(task: LabelingTask):
+            try:
+                return task, await self.getImageForTask(imageryId, task.coordinates, max_size=max_size, padding_factor=padding_factor)
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                return task, e
+
+        taskIter = iter(tasks)
+        pending = deque()
+        try:
+            while True:
+                # keep max_concurrency requests busy, with a bounded number of results waiting to be consumed
+                while len(pending) < 2 * self.max_concurrency:
+                    task = next(taskIter, None)
+                    if task is None:
+                        break
+                    pending.append(asyncio.ensure_future(fetch(task)))
+                if not pending:
+                    return
+
+                if ordered:
+                    yield await pending.popleft()
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    finished = [future for future in pending if future in done]
+                    pending = deque(future for future in pending if future not in done)
+                    for future in finished:
+                        yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    async def getLargeImageForTask(self, imageryId: int, 
+                                   coordinates: List[List[float]], 
+                                   resolution: float, 
+                                   tile_size: int = 1024, 
+                                   padding_factor: float = None,
+                                   max_workers: int = 8) -> Tuple[np.ndarray, TaskGeoTransform]:
+        """See Client.getLargeImageForTask"""
+        return await self._run(self.client.getLargeImageForTask, imageryId, coordinates, resolution, 
+                               tile_size=tile_size, padding_factor=padding_factor, max_workers=max_workers)
+
+    async def iterTilesForTask(self, imageryId: int, 
+                               coordinates: List[List[float]], 
+                               resolution: float, 
+                               tile_size: int = 1024, 
+                               padding_factor: float = None,
+                               max_workers: int = 8,
+                               ordered: bool = False,
+                               return_exceptions: bool = False) -> AsyncIterator[Tuple[Tile, Union[np.ndarray, Exception]]]:
+        """See Client.iterTilesForTask"""
+        tiles = self.client.iterTilesForTask(imageryId, coordinates, resolution, tile_size=tile_size, padding_factor=padding_factor,
+                                             max_workers=max_workers, ordered=ordered, return_exceptions=return_exceptions)
+        done = object()
+        try:
+            while True:
+                item = await self._run(next, tiles, done)
+                if item is done:
+                    return
+                yield item
+        finally:
+            tiles.close()
+
+    async def getImageStackForTask(self, imagery: List[Union[int, Imagery]], 
+                                   coordinates: List[List[float]], 
+                                   max_size: int = 1024, 
+                                   padding_factor: float = None,
+                                   shape: Tuple[int, int] = None,
+                                   allow_missing: bool = False) -> ImageStack:
+        """See Client.getImageStackForTask, layers are fetched concurrently on the event loop."""
+        from projectkiwi3.stack import stackLayers
+        imageryIds = [layer.id if isinstance(layer, Imagery) else layer for layer in imagery]
+        results = await asyncio.gather(*[self.getImageForTask(imageryId, coordinates, max_size=max_size, padding_factor=padding_factor) 
+                                         for imageryId in imageryIds], return_exceptions=True)
+        return stackLayers(imageryIds, results, max_size=max_size, shape=shape, allow_missing=allow_missing)
+
+    async def addLabel(self, projectId: int, name: str, color: str = "rgb(255, 0, 0)") -> Label:
+        """See Client.addLabel"""
+        return await self._run(self.client.addLabel, projectId, name, color=color)
+
+    async def addAnnotation(self, projectId: int, 
+                            coordinates: List[List[float]], 
+                            shape: str, 
+                            labelId: int, 
+                            confidence: float = 1.0) -> Annotation:
+        """See Client.addAnnotation"""
+        return await self._run(self.client.addAnnotation, projectId, coordinates, shape, labelId, confidence=confidence)
+
+    async def addAnnotations(self, projectId: int, annotations: List[AnnotationPayload]) -> List[Annotation]:
+        """See Client.addAnnotations"""
+        return await self._run(self.client.addAnnotations, projectId, annotations)
+
+    async def uploadAnnotations(self, projectId: int, 
+                                annotations: List[AnnotationPayload], 
+                                chunk_size: int = 1000, 
+                                max_workers: int = 4,
+                                resume_token: str = None) -> UploadResult:
+        """See Client.uploadAnnotations"""
+        return await self._run(self.client.uploadAnnotations, projectId, annotations, 
+                               chunk_size=chunk_size, max_workers=max_workers, resume_token=resume_token)
+
+    async def createProject(self, name: str) -> Project:
+        """See Client.createProject"""
+        return await self._run(self.client.createProject, name)
@@ -1,21 +1,129 @@
+from __future__ import annotations
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from projectkiwi3.models import Project, Annotation, Label, LabelingQueue, LabelingTask, Imagery, AnnotationPayload
-import numpy as np
-from typing import List, Dict
-from PIL import Image
-import io
+from projectkiwi3.models import AnnotationRecord, LabelRecord, LabelingQueueRecord, LabelRegistry, UploadResult
+from projectkiwi3.stream import iterJsonArray
+from projectkiwi3.metrics import Metrics, MetricEvent, endpointName
+from projectkiwi3.codec import JsonCodec, compress
+from projectkiwi3.ttl import TTLCache
+from projectkiwi3.ratelimit import RateLimiter, retryAfter
+from typing import List, Dict, Iterator, Tuple, Union, TYPE_CHECKING
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from collections import deque
 import base64
-import shapely
+import hashlib
+import json as jsonlib
+import time
+from urllib.parse import urlsplit
+
+# numpy, PIL and shapely are only imported by the methods that use them, 
+# so listing projects or adding annotations doesn't pay for loading them
+if TYPE_CHECKING:
+    import numpy as np
+    from projectkiwi3.cache import ChipCache
+    from projectkiwi3.table import AnnotationTable
+    from projectkiwi3.index import AnnotationIndex
+    from projectkiwi3.geo import TaskGeoTransform
+    from projectkiwi3.tiles import Tile
+    from projectkiwi3.stack import ImageStack
+
+
+def makeSession(pool_connections: int = 10, 
+                pool_maxsize: int = 10, 
+                max_retries: int = 3, 
+                backoff_factor: float = 0.5,
+                idempotent: bool = True,
+                status_forcelist: Tuple[int] = (500, 502, 503, 504),
+                respect_retry_after: bool = True) -> requests.Session:
+    """Create a requests.Session with a keep-alive connection pool and retry/backoff.
+
+    Connections are reused between calls, so only the first request to each host pays for the TCP+TLS handshake.
+    The session may be shared between threads, the pool hands out at most pool_maxsize connections per host.
+
+    Args:
+        pool_connections (int, optional): Number of hosts to keep connection pools for. Defaults to 10.
+        pool_maxsize (int, optional): Maximum number of connections kept open per host. Defaults to 10.
+        max_retries (int, optional): Retries on connection errors and 5xx responses. Defaults to 3.
+        backoff_factor (float, optional): Exponential backoff between retries, sleeps 
+                backoff_factor * 2^(retry - 1) seconds. Defaults to 0.5.
+        idempotent (bool, optional): Whether requests sent with this session can be safely repeated. 
+                If False, only connection errors are retried since the server never saw the request. Defaults to True.
+        status_forcelist (Tuple[int], optional): Statuses to retry. Defaults to (500, 502, 503, 504).
+        respect_retry_after (bool, optional): Also retry 413, 429 and 503 responses with a Retry-After header,
+                after waiting as long as it asks. Defaults to True.
+
+    Returns:
+        requests.Session: The session
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries if idempotent else 0,
+        status=max_retries if idempotent else 0,
+        backoff_factor=backoff_factor,
+        status_forcelist=list(status_forcelist),
+        allowed_methods=frozenset(["GET", "POST"]),
+        raise_on_status=False,
+        respect_retry_after_header=respect_retry_after
+    )
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
 class Client():
-    imageryUrls: Dict[int, str] = {}
 
-    def __init__(self, key: str, url:str ="https://projectkiwi.io"):
+    def __init__(self, key: str, url:str ="https://projectkiwi.io",
+                 pool_connections: int = 10,
+                 pool_maxsize: int = 10,
+                 max_retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 timeout: float = 60.0,
+                 part_url: str = "https://api.projectkiwi.io/v3/get_part",
+                 chip_cache: ChipCache = None,
+                 metrics: Metrics = None,
+                 json_codec: JsonCodec = None,
+                 compress_requests: str = None,
+                 compress_min_bytes: int = 16 * 1024,
+                 cache_ttl: float = 60.0,
+                 url_ttl: float = 600.0,
+                 rate_limiter: RateLimiter = None):
         """constructor
 
         Args:
             key (str): API key.
             url (str, optional): url for api, mostly used for development. Defaults to "https://projectkiwi.io".
+            pool_connections (int, optional): Number of hosts to keep connection pools for. Defaults to 10.
+            pool_maxsize (int, optional): Maximum connections kept open per host, 
+                    set this to at least the number of threads sharing the client. Defaults to 10.
+            max_retries (int, optional): Retries on connection errors and 5xx responses. Defaults to 3.
+            backoff_factor (float, optional): Exponential backoff factor between retries in seconds. Defaults to 0.5.
+            timeout (float, optional): Timeout in seconds for connecting and for each read. Defaults to 60.0.
+            part_url (str, optional): url of the imagery extraction service used by getImageForTask.
+            chip_cache (ChipCache, optional): On-disk cache for getImageForTask, disabled by default.
+            metrics (Metrics, optional): Where to record request timings and counts, may be shared between clients.
+                    Defaults to a new Metrics, available as client.metrics.
+            json_codec (JsonCodec, optional): JSON backend for get and post. Defaults to orjson if installed, 
+                    otherwise the standard library.
+            compress_requests (str, optional): Compress POST bodies of at least compress_min_bytes with 
+                    "gzip" or "zstd" (needs zstandard), the server must accept Content-Encoding on requests. 
+                    Disabled by default. Responses are always compressed if the server supports it.
+            compress_min_bytes (int, optional): Smallest body worth compressing. Defaults to 16KiB.
+            cache_ttl (float, optional): Seconds to reuse responses from getProject, getLabels, getImagery and 
+                    getLabelingQueue, 0 to always refetch. Concurrent identical calls share one request either way. 
+                    Defaults to 60.
+            url_ttl (float, optional): Seconds to reuse imagery download urls, which are also refreshed 
+                    if get_part rejects them. Defaults to 600.
+            rate_limiter (RateLimiter, optional): Limits the rate and concurrency of requests, may be shared between
+                    clients. Throttled requests (429, or 503 for reads) are then retried up to max_retries times 
+                    once the limiter allows, instead of raising. Streamed responses (iterGet, iterAnnotations) 
+                    hold their slot until fully read. Disabled by default.
         """
 
         self.key = key
@@ -25,9 +133,53 @@ class Client():
             url = url[:-2]
         self.url = url
 
+        self.timeout = timeout
+        self.part_url = part_url
+        self.chip_cache = chip_cache
+        self.metrics = Metrics() if metrics is None else metrics
+        self.json_codec = JsonCodec.default() if json_codec is None else json_codec
+        if compress_requests is not None:
+            compress(b"", compress_requests) # fail early if unsupported
+        self.compress_requests = compress_requests
+        self.compress_min_bytes = compress_min_bytes
+        self.url_ttl = url_ttl
+        self.metadata = TTLCache(cache_ttl, metrics=self.metrics)
+        self.max_retries = max_retries
+        self.rate_limiter = rate_limiter
+        # reads (including get_part) are retried on 5xx, writes only on connection errors. 
+        # With a rate limiter, 429s and 503s are left to the limiter so it can back off.
+        self.session = makeSession(pool_connections=pool_connections, 
+                                   pool_maxsize=pool_maxsize, 
+                                   max_retries=max_retries, 
+                                   backoff_factor=backoff_factor,
+                                   status_forcelist=(500, 502, 504) if rate_limiter else (500, 502, 503, 504),
+                                   respect_retry_after=rate_limiter is None)
+        self.writeSession = makeSession(pool_connections=pool_connections, 
+                                        pool_maxsize=pool_maxsize, 
+                                        max_retries=max_retries, 
+                                        backoff_factor=backoff_factor,
+                                        idempotent=False,
+                                        respect_retry_after=rate_limiter is None)
+
+        # a local dev server has a self-signed cert, but only requests to it skip verification,
+        # get_part and anything else remote are still checked
+        self._insecureHost = None
         if "localhost" in self.url:
             import urllib3
             urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+            self._insecureHost = urlsplit(self.url).netloc
+
+    def close(self):
+        """Close all pooled connections.
+        """
+        self.session.close()
+        self.writeSession.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
 
     
     def get(self, url: str) -> any:
@@ -37,16 +189,65 @@ class Client():
             url (str): Full url to be passed to requests.get
 
         Returns:
-            any: resp.json() from response
+            any: parsed json from response
         """
-        if "localhost" in self.url:
-            resp = requests.get(url, verify=False, headers={'x-api-key': self.key})
-        else:
-            resp = requests.get(url, headers={'x-api-key': self.key})
+        endpoint = endpointName("GET", url)
+        with self._request(self.session, "GET", url, headers={'x-api-key': self.key}) as (resp, start):
+            resp.content
+            self._observeResponse(endpoint, resp, time.perf_counter() - start)
         resp.raise_for_status()
-        return resp.json()
+        with self.metrics.timer(endpoint, "parse"):
+            return self.json_codec.loads(resp.content)
     
 
+    def iterGet(self, url: str, chunk_size: int = 1024 * 1024) -> Iterator[any]:
+        """Streaming version of get for endpoints returning a json array, the response is parsed 
+        incrementally so memory use does not grow with the size of the response.
+
+        With a rate limiter the request holds its slot until iteration finishes, so other calls on a client 
+        sharing the limiter made while iterating may wait on it, and never return if it allows only one 
+        request at a time. Collect the elements first (e.g. list()) to make other calls.
+
+        Args:
+            url (str): Full url to be passed to requests.get
+            chunk_size (int, optional): bytes to read from the connection at a time. Defaults to 1MiB.
+
+        Yields:
+            any: each element of the json array
+        """
+        endpoint = endpointName("GET", url)
+        with self._request(self.session, "GET", url, headers={'x-api-key': self.key}, stream=True) as (resp, start), resp:
+            # network time is time to the headers plus time spent reading the body, parse time is the rest of 
+            # the time spent producing elements, time spent by the caller between elements is not counted
+            network = time.perf_counter() - start
+            parse = 0.0
+
+            def chunks() -> Iterator[bytes]:
+                nonlocal network
+                body = resp.iter_content(chunk_size=chunk_size)
+                while True:
+                    start = time.perf_counter()
+                    chunk = next(body, None)
+                    network += time.perf_counter() - start
+                    if chunk is None:
+                        return
+                    yield chunk
+
+            try:
+                resp.raise_for_status()
+                elements = iterJsonArray(chunks())
+                done = object()
+                while True:
+                    start, before = time.perf_counter(), network
+                    element = next(elements, done)
+                    parse += time.perf_counter() - start - (network - before)
+                    if element is done:
+                        return
+                    yield element
+            finally:
+                self._observeResponse(endpoint, resp, network)
+                self.metrics.observe(MetricEvent(endpoint, "parse", parse))
+
     def post(self, url: str, json: dict) -> any:
         """requests.post wrapper that adds api key.
 
@@ -55,18 +256,94 @@ class Client():
             json (dict): request body in dict form
 
         Returns:
-            any: resp.json() from response
+            any: parsed json from response
         """        
-        if "localhost" in self.url:
-            resp = requests.post(url, json=json, verify=False, headers={'x-api-key': self.key})
-        else:
-            resp = requests.post(url, json=json, headers={'x-api-key': self.key})
+        endpoint = endpointName("POST", url)
+        headers = {'x-api-key': self.key, 'Content-Type': 'application/json'}
+        body = self.json_codec.dumps(json)
+        if self.compress_requests and len(body) >= self.compress_min_bytes:
+            body = compress(body, self.compress_requests)
+            headers['Content-Encoding'] = self.compress_requests
+        with self._request(self.writeSession, "POST", url, idempotent=False, data=body, headers=headers) as (resp, start):
+            resp.content
+            self._observeResponse(endpoint, resp, time.perf_counter() - start)
         try:
             resp.raise_for_status()
         except Exception as e:
             print(f"Failed to POST, reason: {resp.text}")
             raise e
-        return resp.json()
+        with self.metrics.timer(endpoint, "parse"):
+            return self.json_codec.loads(resp.content)
+
+    @contextmanager
+    def _request(self, session: requests.Session, method: str, url: str, idempotent: bool = True, **kwargs) -> Iterator[Tuple[requests.Response, float]]:
+        """Send a request through the rate limiter if there is one, retrying throttled requests.
+
+        Args:
+            session (requests.Session): session to send with
+            method (str): http method
+            url (str): Full url
+            idempotent (bool, optional): Whether 503s may be retried as well as 429s. Defaults to True.
+            **kwargs: passed to session.request
+
+        Yields:
+            Tuple[requests.Response, float]: the response and when it was sent (time.perf_counter), 
+                    the limiter's slot is held until the block exits so streamed bodies count as in flight
+        """
+        limiter = self.rate_limiter
+        throttled = (429, 503) if idempotent else (429,)
+        attempt = 0
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            status, wait = 0, None
+            try:
+                start = time.perf_counter()
+                if self._insecureHost is not None and urlsplit(url).netloc == self._insecureHost:
+                    kwargs.setdefault("verify", False)
+                resp = session.request(method, url, timeout=self.timeout, **kwargs)
+                status, wait = resp.status_code, retryAfter(resp.headers.get("Retry-After"))
+                if limiter is not None and status in throttled and attempt < self.max_retries:
+                    resp.content
+                    self._observeResponse(endpointName(method, url), resp, time.perf_counter() - start)
+                    resp.close()
+                    attempt += 1
+                    continue
+                yield resp, start
+                return
+            finally:
+                if limiter is not None:
+                    limiter.release(status, wait)
+
+    def _cachedGet(self, url: str, ttl: float = None) -> any:
+        """get through the metadata cache, see cache_ttl
+
+        Args:
+            url (str): Full url to be passed to requests.get
+            ttl (float, optional): Seconds to keep the response. Defaults to cache_ttl.
+
+        Returns:
+            any: parsed json from response, shared between callers so it should not be modified
+        """
+        return self.metadata.get(url, lambda: self.get(url), ttl)
+
+    def _observeResponse(self, endpoint: str, resp: requests.Response, seconds: float):
+        """Record the network phase of a request, byte counts are as sent over the wire i.e. after compression.
+
+        Args:
+            endpoint (str): endpoint name, see endpointName
+            resp (requests.Response): the response, with the body read as far as it will be
+            seconds (float): time from sending the request to reading the body
+        """
+        body = resp.request.body
+        retries = getattr(getattr(resp.raw, "retries", None), "history", None) or ()
+        self.metrics.observe(MetricEvent(
+            endpoint, "network", seconds,
+            status=resp.status_code,
+            requestBytes=len(body) if body else 0,
+            responseBytes=resp.raw.tell(),
+            retries=len(retries)
+        ))
     
     def getProject(self, projectId: int) -> List[Project]:
         """Get project details.
@@ -74,9 +351,11 @@ class Client():
         Returns:
             Project: Project details
         """
-        json = self.get(f"{self.url}/api/project/{projectId}")
-        project: Project = Project.from_dict(json)
-        return project
+        url = f"{self.url}/api/project/{projectId}"
+        json = self._cachedGet(url)
+        with self.metrics.timer(endpointName("GET", url), "build"):
+            project: Project = Project.from_dict(json)
+            return project
 
     def getProjects(self) -> List[Project]:
         """Get a list of projects for the user.
@@ -84,66 +363,151 @@ class Client():
         Returns:
             List[Project]: Projects
         """
-        json = self.get(f"{self.url}/api/project")
-        projects: List[Project] = [Project.from_dict(projectDict) for projectDict in json]
-        return projects
+        url = f"{self.url}/api/project"
+        json = self.get(url)
+        with self.metrics.timer(endpointName("GET", url), "build"):
+            projects: List[Project] = [Project.from_dict(projectDict) for projectDict in json]
+            return projects
     
 
 
-    def getLabels(self, projectId: int) -> List[Label]:
+    def getLabels(self, projectId: int, trusted: bool = False) -> List[Union[Label, LabelRecord]]:
         """Get all labels for a given project.
 
         Args:
             projectId (int): The ID of the project e.g. 869
+            trusted (bool, optional): Skip validation and return lightweight LabelRecords instead, 
+                    several times faster and smaller for large projects. Defaults to False.
 
         Returns:
-            List[Label]: All labels in the project(active and inactive)
+            List[Union[Label, LabelRecord]]: All labels in the project(active and inactive)
         """        
-        json = self.get(f"{self.url}/api/project/{projectId}/labels")
-        labels: List[Label] = [Label.from_dict(labelDict) for labelDict in json]
-        return labels
+        url = f"{self.url}/api/project/{projectId}/labels"
+        json = self._cachedGet(url)
+        with self.metrics.timer(endpointName("GET", url), "build"):
+            model = LabelRecord if trusted else Label
+            labels: List[Union[Label, LabelRecord]] = [model.from_dict(labelDict) for labelDict in json]
+            return labels
 
     
-    def getAnnotations(self, projectId: int) -> List[Annotation]:
+    def getAnnotations(self, projectId: int, trusted: bool = False, labels: List[Label] = None) -> List[Union[Annotation, AnnotationRecord]]:
         """Get all annotations in the project.
 
         Args:
             projectId (int): The ID of the project e.g. 869
+            trusted (bool, optional): Skip validation and return lightweight AnnotationRecords instead,
+                    several times faster and smaller for large projects. Defaults to False.
+            labels (List[Label], optional): Labels from getLabels, annotations with these labels share them
+                    and skip parsing the embedded label. Other labels are still shared between annotations.
 
         Returns:
-            List[Annotation]: All annotations in the project.
+            List[Union[Annotation, AnnotationRecord]]: All annotations in the project.
         """
-        json = self.get(f"{self.url}/api/project/{projectId}/annotations")
-        annotations: List[Annotation] = [Annotation.from_dict(dict) for dict in json]
-        return annotations
+        url = f"{self.url}/api/project/{projectId}/annotations"
+        json = self.get(url)
+        with self.metrics.timer(endpointName("GET", url), "build"):
+            model = AnnotationRecord if trusted else Annotation
+            registry = LabelRegistry(LabelRecord if trusted else Label, labels)
+            annotations: List[Union[Annotation, AnnotationRecord]] = [model.from_dict(dict, registry) for dict in json]
+            return annotations
 
 
 
-    def getLabelingQueues(self, projectId: int) -> List[LabelingQueue]:
+    def iterAnnotations(self, projectId: int, batch_size: int = None, trusted: bool = False, labels: List[Label] = None) -> Iterator[Union[Annotation, AnnotationRecord, List[Union[Annotation, AnnotationRecord]]]]:
+        """Iterate over all annotations in the project without loading them all into memory.
+        With a rate limiter, see iterGet before making other calls while iterating.
+
+        Args:
+            projectId (int): The ID of the project e.g. 869
+            batch_size (int, optional): If set, yield lists of up to batch_size annotations instead of single annotations.
+            trusted (bool, optional): Skip validation and return lightweight AnnotationRecords instead,
+                    several times faster and smaller for large projects. Defaults to False.
+            labels (List[Label], optional): Labels from getLabels, annotations with these labels share them
+                    and skip parsing the embedded label. Other labels are still shared between annotations.
+
+        Yields:
+            Union[Annotation, AnnotationRecord, List[Union[Annotation, AnnotationRecord]]]: Each annotation, or batches of annotations
+        """
+        model = AnnotationRecord if trusted else Annotation
+        registry = LabelRegistry(LabelRecord if trusted else Label, labels)
+        annotations = (model.from_dict(dict, registry) for dict in self.iterGet(f"{self.url}/api/project/{projectId}/annotations"))
+        if not batch_size:
+            yield from annotations
+            return
+
+        batch: List[Annotation] = []
+        for annotation in annotations:
+            batch.append(annotation)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+    def getAnnotationTable(self, projectId: int) -> AnnotationTable:
+        """Get all annotations in the project as a columnar AnnotationTable, the response is streamed
+        straight into numpy arrays without creating an Annotation per row.
+
+        Args:
+            projectId (int): The ID of the project e.g. 869
+
+        Returns:
+            AnnotationTable: All annotations in the project.
+        """
+        from projectkiwi3.table import AnnotationTable
+        return AnnotationTable.from_json(self.iterGet(f"{self.url}/api/project/{projectId}/annotations"))
+
+
+    def getAnnotationIndex(self, projectId: int, labelIds: List[int] = None) -> AnnotationIndex:
+        """Get a spatial index over the annotations in the project, for finding annotations within tasks.
+
+        Args:
+            projectId (int): The ID of the project e.g. 869
+            labelIds (List[int], optional): Only index annotations with these labels.
+
+        Returns:
+            AnnotationIndex: Index over the annotations
+        """
+        from projectkiwi3.index import AnnotationIndex
+        return AnnotationIndex(self.getAnnotationTable(projectId), labelIds)
+
+
+    def getLabelingQueues(self, projectId: int, trusted: bool = False) -> List[Union[LabelingQueue, LabelingQueueRecord]]:
         """ Get all labeling queues for the project (sometimes called labeling workflows)
 
         Args:
             projectId (int): The ID of the project e.g. 869
+            trusted (bool, optional): Skip validation and return lightweight LabelingQueueRecords instead,
+                    several times faster and smaller for large projects. Defaults to False.
 
         Returns:
-            List[LabelingQueue]: All labeling queues
+            List[Union[LabelingQueue, LabelingQueueRecord]]: All labeling queues
         """
-        json = self.get(f"{self.url}/api/project/{projectId}/labelingQueue")
-        queues: List[LabelingQueue] = [LabelingQueue.from_dict(dict) for dict in json]
-        return queues
+        url = f"{self.url}/api/project/{projectId}/labelingQueue"
+        json = self.get(url)
+        with self.metrics.timer(endpointName("GET", url), "build"):
+            model = LabelingQueueRecord if trusted else LabelingQueue
+            queues: List[Union[LabelingQueue, LabelingQueueRecord]] = [model.from_dict(dict) for dict in json]
+            return queues
     
-    def getLabelingQueue(self, id: int) -> LabelingQueue:
+    def getLabelingQueue(self, id: int, trusted: bool = False) -> Union[LabelingQueue, LabelingQueueRecord]:
         """ Get labeling queue for a given id
 
         Args:
             id (int): The ID of the labeling queue, sometimes called 'labeling workflow' e.g. 421
+            trusted (bool, optional): Skip validation and return a lightweight LabelingQueueRecord instead,
+                    several times faster and smaller for large projects. Defaults to False.
 
         Returns:
-            LabelingQueue: The labelingQueue
+            Union[LabelingQueue, LabelingQueueRecord]: The labelingQueue
         """
-        json = self.get(f"{self.url}/api/labelingQueue/{id}")
-        queue: LabelingQueue = LabelingQueue.from_dict(json)
-        return queue
+        url = f"{self.url}/api/labelingQueue/{id}"
+        json = self._cachedGet(url)
+        with self.metrics.timer(endpointName("GET", url), "build"):
+            model = LabelingQueueRecord if trusted else LabelingQueue
+            queue: Union[LabelingQueue, LabelingQueueRecord] = model.from_dict(json)
+            return queue
     
     
     def getAllImagery(self, projectId: int) -> List[Imagery]:
@@ -155,9 +519,11 @@ class Client():
         Returns:
             List[Imagery]: All imagery layers
         """        
-        json = self.get(f"{self.url}/api/project/{projectId}/imagery")
-        imagery: List[Imagery] = [Imagery.from_dict(dict) for dict in json]
-        return imagery
+        url = f"{self.url}/api/project/{projectId}/imagery"
+        json = self.get(url)
+        with self.metrics.timer(endpointName("GET", url), "build"):
+            imagery: List[Imagery] = [Imagery.from_dict(dict) for dict in json]
+            return imagery
     
     def getImagery(self, imageryId: int) -> Imagery:
         """ Get a single imagery layer
@@ -168,12 +534,34 @@ class Client():
         Returns:
             Imagery: The imagery layers
         """        
-        json = self.get(f"{self.url}/api/imagery/{imageryId}")
-        imagery: Imagery = Imagery.from_dict(json) 
-        return imagery
+        url = f"{self.url}/api/imagery/{imageryId}"
+        json = self._cachedGet(url)
+        with self.metrics.timer(endpointName("GET", url), "build"):
+            imagery: Imagery = Imagery.from_dict(json) 
+            return imagery
 
     
-    def getImageForTask(self, imageryId: int, coordinates: List[List[float]], max_size: int = 1024, padding_factor: float = None) -> np.array:
+    def getImageryUrl(self, imageryId: int, stale: str = None) -> str:
+        """ Get the (signed) download url for an imagery layer (cloud optimized geotiff), cached for url_ttl seconds
+
+        Args:
+            imageryId (int): The ID of the imagery layer e.g. 869
+            stale (str, optional): A url that was rejected, a new one is fetched unless it was already replaced.
+
+        Returns:
+            str: url for the imagery layer
+        """
+        url = f"{self.url}/api/imagery/{imageryId}/download_url"
+        if stale is not None:
+            self.metadata.invalidate(url, stale)
+        return self._cachedGet(url, self.url_ttl)
+
+    def getImageForTask(self, imageryId: int, 
+                        coordinates: List[List[float]], 
+                        max_size: int = 1024, 
+                        padding_factor: float = None,
+                        out: np.ndarray = None,
+                        encoded: bool = False) -> Union[np.array, bytes]:
         """Get a numpy array for a given imagery layer within a set of coordinates.
 
         Args:
@@ -181,22 +569,32 @@ class Client():
             coordinates (List[List[float]]): coordinates in [[lng,lat], [lng,lat]] format
             max_size (int, optional): maximum width for the image. Defaults to 1024.
             padding_factor(float, optional): How much space to pad on each size. e.g. 0.2 will add 20% to each side
+            out (np.ndarray, optional): Preallocated array to decode into, e.g. batch[i] of a (B,H,W,C) batch. 
+                    Must be at least as large as the image, which is written to the top left corner with the rest zeroed.
+            encoded (bool, optional): Return the still encoded image bytes (e.g. png) instead of decoding them,
+                    for caching or forwarding. The chip cache is not used. Defaults to False.
 
         Returns:
-            np.array: image, which may include black borders for irregular shapes or at edges of layer.
+            np.array: image, which may include black borders for irregular shapes or at edges of layer. 
+                    out if given, or bytes if encoded is set.
         """       
-
+        from projectkiwi3.cache import ChipCache
+        from projectkiwi3.geo import padPolygon
+        from projectkiwi3.chips import readBody, decodeBase64, decodeImage, copyInto
+
+        cacheKey = None
+        if self.chip_cache is not None and not encoded:
+            modifiedAt = self.getImagery(imageryId).modifiedAt
+            cacheKey = ChipCache.key(imageryId, modifiedAt, coordinates, max_size, padding_factor)
+            image = self.chip_cache.get(cacheKey)
+            self.metrics.observeCache("chip", image is not None)
+            if image is not None:
+                return image if out is None else copyInto(image, out)
 
         if padding_factor:
-            polygon = shapely.Polygon(coordinates)
-            scaled_polygon = shapely.affinity.scale(polygon, xfact=1+(2*padding_factor), yfact=1+(2*padding_factor))
-            coordinates = list(scaled_polygon.exterior.coords)
+            coordinates = padPolygon(coordinates, padding_factor)
 
 
-        if not imageryId in self.imageryUrls:
-            self.imageryUrls[imageryId] = self.get(f"{self.url}/api/imagery/{imageryId}/download_url")
-        
-        
         featureDict = {
             "type": "Feature",
             "properties": {},
@@ -205,16 +603,190 @@ class Client():
                 "type": "Polygon"
             }
         }
-        r = requests.post("https://api.projectkiwi.io/v3/get_part", 
-                            json={'polygon': featureDict,
-                            'cog_url': self.imageryUrls[imageryId],
-                            'max_size': max_size,
-                            'base64': False
-        })
-        r.raise_for_status()
-        image = Image.open(io.BytesIO(base64.decodebytes(bytes(r.text, "utf-8"))))
-        return np.asarray(image)
+        endpoint = endpointName("POST", self.part_url)
+        cogUrl = self.getImageryUrl(imageryId)
+        for attempt in range(2):
+            with self._request(self.session, "POST", self.part_url, 
+                                json={'polygon': featureDict,
+                                'cog_url': cogUrl,
+                                'max_size': max_size,
+                                'base64': False
+            }, stream=True) as (r, start), r:
+                body = readBody(r) if r.ok else None
+                self._observeResponse(endpoint, r, time.perf_counter() - start)
+                expired = r.status_code == 403 and attempt == 0
+                if not expired:
+                    r.raise_for_status()
+                    # the body is base64 text, decode it straight from the reusable read buffer. 
+                    # one parse observation per request, covering both decodes
+                    with self.metrics.timer(endpoint, "parse"):
+                        image = decodeBase64(body)
+                        if not encoded:
+                            image = decodeImage(image)
+            if not expired:
+                break
+            # the signed url has expired, get a new one and try again. outside the request so its 
+            # rate limiter slot is released first, otherwise a limit of 1 would wait on itself
+            cogUrl = self.getImageryUrl(imageryId, stale=cogUrl)
+        if encoded:
+            return image
+
+        if cacheKey is not None:
+            self.chip_cache.put(cacheKey, image)
+        return image if out is None else copyInto(image, out)
     
+    def getImagesForTasks(self, imageryId: int, 
+                          tasks: Union[List[LabelingTask], LabelingQueue], 
+                          max_size: int = 1024, 
+                          padding_factor: float = None,
+                          max_workers: int = 8,
+                          ordered: bool = True,
+                          return_exceptions: bool = True) -> Iterator[Tuple[LabelingTask, Union[np.array, Exception]]]:
+        """Fetch images for many tasks concurrently, see getImageForTask.
+
+        At most max_workers requests are in flight, and only a few more results are buffered, 
+        so this can be used over very large labeling queues.
+
+        Args:
+            imageryId (int): Id of Imagery layer to extract images from
+            tasks (Union[List[LabelingTask], LabelingQueue]): Tasks to fetch, or a labeling queue to fetch all tasks from.
+                    Records from trusted=True may be used as well.
+            max_size (int, optional): maximum width for each image. Defaults to 1024.
+            padding_factor (float, optional): How much space to pad on each size. e.g. 0.2 will add 20% to each side
+            max_workers (int, optional): Number of concurrent requests. Defaults to 8.
+            ordered (bool, optional): Yield results in the same order as tasks, otherwise as they complete. Defaults to True.
+            return_exceptions (bool, optional): Yield (task, exception) for failed tasks instead of raising, 
+                    so one failure does not abort the batch. Defaults to True.
+
+        Yields:
+            Tuple[LabelingTask, Union[np.array, Exception]]: (task, image) pairs
+        """
+        if isinstance(tasks, (LabelingQueue, LabelingQueueRecord)):
+            tasks = tasks.labelingTasks
+
+        # resolve the download url once up front rather than in every worker
+        self.getImageryUrl(imageryId)
+
+        def result(task: LabelingTask, future: Future) -> Tuple[LabelingTask, Union[np.array, Exception]]:
+            error = future.exception()
+            if error is None:
+                return task, future.result()
+            if not return_exceptions:
+                raise error
+            return task, error
+
+        taskIter = iter(tasks)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="projectkiwi3") as executor:
+            try:
+                while True:
+                    # keep the pool busy, with a bounded number of results waiting to be consumed
+                    while len(pending) < 2 * max_workers:
+                        task = next(taskIter, None)
+                        if task is None:
+                            break
+                        future = executor.submit(self.getImageForTask, imageryId, task.coordinates, 
+                                                 max_size=max_size, padding_factor=padding_factor)
+                        pending.append((task, future))
+                    if not pending:
+                        return
+
+                    if ordered:
+                        task, future = pending.popleft()
+                        wait([future])
+                        yield result(task, future)
+                    else:
+                        done, _ = wait([future for _, future in pending], return_when=FIRST_COMPLETED)
+                        finished = [item for item in pending if item[1] in done]
+                        pending = deque(item for item in pending if item[1] not in done)
+                        for task, future in finished:
+                            yield result(task, future)
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
+    def getLargeImageForTask(self, imageryId: int, 
+                             coordinates: List[List[float]], 
+                             resolution: float, 
+                             tile_size: int = 1024, 
+                             padding_factor: float = None,
+                             max_workers: int = 8) -> Tuple[np.ndarray, TaskGeoTransform]:
+        """Get an image for a task at a given ground resolution, however large. The task is split into tiles 
+        of at most tile_size, fetched concurrently and stitched together.
+
+        Args:
+            imageryId (int): Id of Imagery layer to extract image from
+            coordinates (List[List[float]]): coordinates in [[lng,lat], [lng,lat]] format
+            resolution (float): Ground size of a pixel in metres e.g. 0.1
+            tile_size (int, optional): Maximum width and height of each request. Defaults to 1024.
+            padding_factor (float, optional): How much space to pad on each size. e.g. 0.2 will add 20% to each side
+            max_workers (int, optional): Number of concurrent requests. Defaults to 8.
+
+        Returns:
+            Tuple[np.ndarray, TaskGeoTransform]: the image, black outside the task, and the transform between 
+                    its pixels and lng, lat (Web Mercator), e.g. for utils.boxesToLngLatPolygons(..., transform=transform)
+        """
+        from projectkiwi3.tiles import TileGrid, fetchMosaic
+        grid = TileGrid(coordinates, resolution, tile_size=tile_size, padding_factor=padding_factor)
+        return fetchMosaic(self, imageryId, grid, max_workers=max_workers), grid.transform
+
+    def iterTilesForTask(self, imageryId: int, 
+                         coordinates: List[List[float]], 
+                         resolution: float, 
+                         tile_size: int = 1024, 
+                         padding_factor: float = None,
+                         max_workers: int = 8,
+                         ordered: bool = False,
+                         return_exceptions: bool = False) -> Iterator[Tuple[Tile, Union[np.ndarray, Exception]]]:
+        """Streaming version of getLargeImageForTask, for areas too large to hold in memory. 
+        Tiles entirely outside the task are skipped.
+
+        Args:
+            imageryId (int): Id of Imagery layer to extract images from
+            coordinates (List[List[float]]): coordinates in [[lng,lat], [lng,lat]] format
+            resolution (float): Ground size of a pixel in metres e.g. 0.1
+            tile_size (int, optional): Maximum width and height of each tile. Defaults to 1024.
+            padding_factor (float, optional): How much space to pad on each size. e.g. 0.2 will add 20% to each side
+            max_workers (int, optional): Number of concurrent requests. Defaults to 8.
+            ordered (bool, optional): Yield tiles in row major order, otherwise as they complete. Defaults to False.
+            return_exceptions (bool, optional): Yield (tile, exception) for failed tiles instead of raising. Defaults to False.
+
+        Yields:
+            Tuple[Tile, Union[np.ndarray, Exception]]: (tile, image) pairs, tile.x and tile.y place the image within 
+                    the full image and tile.transform maps its pixels to lng, lat
+        """
+        from projectkiwi3.tiles import TileGrid, iterTiles
+        grid = TileGrid(coordinates, resolution, tile_size=tile_size, padding_factor=padding_factor)
+        yield from iterTiles(self, imageryId, grid, max_workers=max_workers, ordered=ordered, return_exceptions=return_exceptions)
+
+    def getImageStackForTask(self, imagery: List[Union[int, Imagery]], 
+                             coordinates: List[List[float]], 
+                             max_size: int = 1024, 
+                             padding_factor: float = None,
+                             shape: Tuple[int, int] = None,
+                             max_workers: int = 8,
+                             allow_missing: bool = False) -> ImageStack:
+        """Get images for a task from several imagery layers at once, e.g. for change detection. 
+        Layers are fetched concurrently and resized to a common size.
+
+        Args:
+            imagery (List[Union[int, Imagery]]): Imagery layers or their ids, e.g. from getAllImagery
+            coordinates (List[List[float]]): coordinates in [[lng,lat], [lng,lat]] format
+            max_size (int, optional): maximum width for each image. Defaults to 1024.
+            padding_factor (float, optional): How much space to pad on each size. e.g. 0.2 will add 20% to each side
+            shape (Tuple[int, int], optional): (H, W) to resize every layer to. Defaults to the largest layer.
+            max_workers (int, optional): Number of concurrent requests. Defaults to 8.
+            allow_missing (bool, optional): Leave layers that fail empty and record the error in stack.errors, 
+                    instead of raising. Defaults to False.
+
+        Returns:
+            ImageStack: stack.images (L, H, W, C) in the order of imagery, and stack.masks (L, H, W), 
+                    False where a layer has no data (black borders, transparent or missing)
+        """
+        from projectkiwi3.stack import fetchStack
+        return fetchStack(self, imagery, coordinates, max_size=max_size, padding_factor=padding_factor, 
+                          shape=shape, max_workers=max_workers, allow_missing=allow_missing)
+
     def addLabel(self, projectId: int, name: str, color: str = "rgb(255, 0, 0)") -> Label:
         """ Add a label to a project, sometimes called an annotation layer.
 
@@ -226,13 +798,16 @@ class Client():
         Returns:
             Label: The created label
         """   
-        json = self.post(f"{self.url}/api/project/{projectId}/labels", json={
+        url = f"{self.url}/api/project/{projectId}/labels"
+        json = self.post(url, json={
             "name": name,
             "color": color,
             "active": True,
         })
-        newLabel: Label = Label.from_dict(json)
-        return newLabel
+        self.metadata.invalidate(url)
+        with self.metrics.timer(endpointName("POST", url), "build"):
+            newLabel: Label = Label.from_dict(json)
+            return newLabel
 
     def addAnnotation(self, projectId: int, 
                       coordinates: List[List[float]], 
@@ -255,14 +830,16 @@ class Client():
         VALID_SHAPES = ["Point", "Polygon", "Linestring"]
         assert shape in VALID_SHAPES, f"Shape must be one of: {VALID_SHAPES}"
 
-        json = self.post(f"{self.url}/api/project/{projectId}/annotations", json={
+        url = f"{self.url}/api/project/{projectId}/annotations"
+        json = self.post(url, json={
             "coordinates": coordinates,
             "shape": shape,
             "labelId": labelId,
             "confidence": confidence
         })
-        newAnnotation: Annotation = Annotation.from_dict(json)
-        return newAnnotation
+        with self.metrics.timer(endpointName("POST", url), "build"):
+            newAnnotation: Annotation = Annotation.from_dict(json)
+            return newAnnotation
     
     def addAnnotations(self, projectId: int, annotations: List[AnnotationPayload]) -> Annotation:
         """Add multiple annotations to the project
@@ -278,9 +855,73 @@ class Client():
         annotationPayloadJSON = []
         for anno in annotations:
             annotationPayloadJSON.append(anno.toJSON())
-        json = self.post(f"{self.url}/api/project/{projectId}/annotations/multiple", json=annotationPayloadJSON)
+        url = f"{self.url}/api/project/{projectId}/annotations/multiple"
+        json = self.post(url, json=annotationPayloadJSON)
+
+        with self.metrics.timer(endpointName("POST", url), "build"):
+            registry = LabelRegistry()
+            return [Annotation.from_dict(annoJSON, registry) for annoJSON in json]
+
+    def uploadAnnotations(self, projectId: int, 
+                          annotations: List[AnnotationPayload], 
+                          chunk_size: int = 1000, 
+                          max_workers: int = 4,
+                          resume_token: str = None) -> UploadResult:
+        """Add a large number of annotations to the project, in chunks uploaded in parallel. 
+        A failed chunk does not stop the others, re-run with the returned resumeToken to send only the failed chunks.
+
+        Args:
+            projectId (int): ID of the project
+            annotations (List[AnnotationPayload]): list of annotations to add to project
+            chunk_size (int, optional): Annotations per request. Defaults to 1000.
+            max_workers (int, optional): Number of chunks uploaded at once. Defaults to 4.
+            resume_token (str, optional): resumeToken from a previous call with the same annotations, 
+                    chunks it recorded as uploaded are skipped.
 
-        return [Annotation.from_dict(annoJSON) for annoJSON in json]
+        Returns:
+            UploadResult: Created annotations, succeeded and failed chunks, and a token to resume from.
+        """
+        annotationPayloadJSON = [anno.toJSON() for anno in annotations]
+        digest = hashlib.sha256(jsonlib.dumps(annotationPayloadJSON, sort_keys=True).encode()).hexdigest()
+
+        done = set()
+        if resume_token:
+            state = jsonlib.loads(base64.urlsafe_b64decode(resume_token))
+            if state['digest'] != digest:
+                raise ValueError("resume_token was created for a different list of annotations")
+            chunk_size = state['chunkSize']
+            done = set(state['done'])
+
+        chunks = {i: annotationPayloadJSON[start:start + chunk_size] 
+                  for i, start in enumerate(range(0, len(annotationPayloadJSON), chunk_size)) 
+                  if i not in done}
+
+        url = f"{self.url}/api/project/{projectId}/annotations/multiple"
+        created: Dict[int, list] = {}
+        failed: Dict[int, str] = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="projectkiwi3") as executor:
+            futures = {executor.submit(self.post, url, chunk): i for i, chunk in chunks.items()}
+            for future in futures:
+                i = futures[future]
+                try:
+                    created[i] = future.result()
+                except Exception as e:
+                    failed[i] = repr(e)
+
+        done |= set(created)
+        token = base64.urlsafe_b64encode(jsonlib.dumps({
+            'digest': digest,
+            'chunkSize': chunk_size,
+            'done': sorted(done)
+        }).encode()).decode()
+
+        registry = LabelRegistry()
+        return UploadResult(
+            annotations = [Annotation.from_dict(annoJSON, registry) for i in sorted(created) for annoJSON in created[i]],
+            succeededChunks = sorted(created),
+            failedChunks = failed,
+            resumeToken = token
+        )
 
     def createProject(self, name: str) -> Project:
         """Create a new project
@@ -292,6 +933,8 @@ class Client():
             Project: The resulting created annotation.
         """
 
-        json = self.post(f"{self.url}/api/project", json=name)
+        url = f"{self.url}/api/project"
+        json = self.post(url, json=name)
 
-        return Project.from_dict(json)
+        with self.metrics.timer(endpointName("POST", url), "build"):
+            return Project.from_dict(json)
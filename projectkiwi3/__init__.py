@@ -7,6 +7,21 @@ This module is a means for interfacing with projectkiwi using python.
 
 Classes:
     - Client: A class to interface with project kiwi
+    - AsyncClient: Client with every method as a coroutine, for asyncio pipelines
+    - ChipCache: On-disk cache for images from Client.getImageForTask
+    - AnnotationTable: Columnar, numpy backed collection of annotations
+    - TaskGeoTransform: Mapping between task image pixels and lng, lat
+    - AnnotationIndex: Spatial index for finding the annotations within tasks
+    - ProjectMirror: Local SQLite copy of a project, refreshed incrementally
+    - TaskLoader: Batches of task images, prefetched in the background
+    - ChipStore: Memory-mapped fixed slot store of task images for training
+    - Metrics: Request timings, retries, bytes and cache hit ratios per endpoint
+    - JsonCodec: JSON backend used for requests and responses
+    - RateLimiter: Adaptive rate and concurrency limit shared between clients
+    - TileGrid: Split of a large task into tiles at a given ground resolution
+
+Functions:
+    - exportQueue: Export a labeling queue to tar shards for training
 
 Example:
     To get started, try this:
@@ -25,6 +40,61 @@ License:
 
 # your_package/__init__.py
 from .Client import Client
-from .utils import boxToLngLatPolygon
+from .AsyncClient import AsyncClient
+from .metrics import Metrics
+from .codec import JsonCodec
+from .ratelimit import RateLimiter
+
+# The rest is imported on first use (PEP 562), so scripts that only use Client 
+# don't load numpy, PIL or shapely, which take most of the import time.
+import importlib
+from typing import TYPE_CHECKING
+
+_exports = {
+    'ChipCache': '.cache',
+    'AnnotationTable': '.table',
+    'TaskGeoTransform': '.geo',
+    'AnnotationIndex': '.index',
+    'ProjectMirror': '.mirror',
+    'TaskLoader': '.loader',
+    'ChipStore': '.store',
+    'TileGrid': '.tiles',
+    'exportQueue': '.export',
+    'readShard': '.export',
+    'boxToLngLatPolygon': '.utils',
+    'boxesToLngLatPolygons': '.utils',
+}
+
+# submodules that used to be reachable as attributes after import projectkiwi3 e.g. projectkiwi3.utils
+_submodules = ('utils',)
+
+__all__ = ['Client', 'AsyncClient', 'Metrics', 'JsonCodec', 'RateLimiter'] + list(_exports)
+
+
+def __getattr__(name: str):
+    if name in _submodules:
+        return importlib.import_module(f".{name}", __name__)
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
+
+if TYPE_CHECKING:
+    from .cache import ChipCache
+    from .table import AnnotationTable
+    from .geo import TaskGeoTransform
+    from .index import AnnotationIndex
+    from .mirror import ProjectMirror
+    from .loader import TaskLoader
+    from .store import ChipStore
+    from .tiles import TileGrid
+    from .export import exportQueue, readShard
+    from .utils import boxToLngLatPolygon, boxesToLngLatPolygons
 
 __version__ = "0.1.8"
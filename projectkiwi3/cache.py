@@ -0,0 +1,158 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import numpy as np
+from typing import List, Optional
+
+
+class ChipCache():
+
+    def __init__(self, directory: str, max_bytes: int = 10 * 1024**3):
+        """On-disk cache of decoded task images, shared safely between threads and processes.
+
+        Chips are stored as .npy files, written atomically, and evicted least recently used first 
+        once the cache grows beyond max_bytes.
+
+        Args:
+            directory (str): Folder to keep cached chips in, created if missing.
+            max_bytes (int, optional): Size budget for the cache. Defaults to 10GiB.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def key(imageryId: int, modifiedAt: str, coordinates: List[List[float]], max_size: int, padding_factor: float = None) -> str:
+        """Cache key for a chip request.
+
+        Args:
+            imageryId (int): Id of the imagery layer
+            modifiedAt (str): modifiedAt of the imagery layer, so chips are refetched if the layer changes
+            coordinates (List[List[float]]): task coordinates in [[lng,lat], [lng,lat]] format
+            max_size (int): maximum width of the image
+            padding_factor (float, optional): padding applied to the task
+
+        Returns:
+            str: hex digest identifying the chip
+        """
+        # ignore float noise and whether the ring is closed
+        points = [[round(float(lng), 9), round(float(lat), 9)] for lng, lat in coordinates]
+        if len(points) > 1 and points[0] == points[-1]:
+            points = points[:-1]
+        description = json.dumps([imageryId, modifiedAt, points, max_size, padding_factor or 0.0])
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.npy")
+
+    def _entries(self):
+        """(path, last used, size) for every chip in the cache
+        """
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                if not file.endswith(".npy"):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError: # evicted by another process
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Load a chip from the cache.
+
+        Args:
+            key (str): key from ChipCache.key
+
+        Returns:
+            Optional[np.ndarray]: The chip, or None if it is not cached
+        """
+        path = self._path(key)
+        try:
+            array = np.load(path, allow_pickle=False)
+            os.utime(path) # mark as recently used
+        except (FileNotFoundError, ValueError, EOFError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return array
+
+    def put(self, key: str, array: np.ndarray):
+        """Add a chip to the cache, evicting old chips if over budget.
+
+        Args:
+            key (str): key from ChipCache.key
+            array (np.ndarray): the chip
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # write to a temporary file in the same folder then rename, so readers never see partial chips
+        fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, np.ascontiguousarray(array), allow_pickle=False)
+                size = f.tell()
+            # an existing chip for this key is overwritten, so its size no longer counts
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmpPath, path)
+        except BaseException:
+            os.remove(tmpPath)
+            raise
+
+        with self._lock:
+            self._bytes += size - replaced
+            overBudget = self._bytes > self.max_bytes
+        if overBudget:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used chips until the cache is back under budget.
+        Other processes may share the folder, so the size is recounted from disk.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._bytes = total
+
+    def clear(self):
+        """Remove every chip from the cache.
+        """
+        for path, _, _ in list(self._entries()):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._bytes = 0
+
+    @property
+    def size(self) -> int:
+        """Approximate size of the cache in bytes"""
+        return self._bytes
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of lookups served from the cache"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,85 @@
+import io
+import binascii
+import threading
+import numpy as np
+import requests
+
+
+_buffers = threading.local()
+
+
+def readBody(resp: requests.Response, chunk_size: int = 1024 * 1024) -> memoryview:
+    """Read a streamed response body into a buffer reused between calls on the same thread.
+
+    Args:
+        resp (requests.Response): response from a request made with stream=True
+        chunk_size (int, optional): bytes read from the connection at a time. Defaults to 1MiB.
+
+    Returns:
+        memoryview: the body, only valid until the next call on this thread
+    """
+    buffer: bytearray = getattr(_buffers, "buffer", None)
+    expected = int(resp.headers.get("Content-Length", 0))
+    if buffer is None or len(buffer) < max(expected, chunk_size):
+        buffer = _buffers.buffer = bytearray(max(expected, chunk_size))
+
+    raw = resp.raw
+    raw.decode_content = True
+    view = memoryview(buffer)
+    size = 0
+    while True:
+        if size == len(buffer):
+            # grow, keeping what has been read so far
+            grown = _buffers.buffer = bytearray(2 * len(buffer))
+            grown[:size] = view[:size]
+            buffer, view = grown, memoryview(grown)
+        n = raw.readinto(view[size:size + chunk_size])
+        if not n:
+            break
+        size += n
+    return view[:size]
+
+
+def decodeBase64(body: memoryview) -> bytes:
+    """Decode a base64 body (line breaks allowed) without first copying it to a str
+
+    Args:
+        body (memoryview): base64 encoded bytes
+
+    Returns:
+        bytes: the decoded bytes
+    """
+    return binascii.a2b_base64(body)
+
+
+def decodeImage(encoded: bytes) -> np.ndarray:
+    """Decode an encoded image (png, jpeg, ...) to an array.
+
+    Args:
+        encoded (bytes): the encoded image
+
+    Returns:
+        np.ndarray: the image
+    """
+    from PIL import Image # only needed once images are decoded, not for encoded=True or copying
+    return np.asarray(Image.open(io.BytesIO(encoded)))
+
+
+def copyInto(image: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Write image into the top left corner of out and zero the rest.
+
+    Args:
+        image (np.ndarray): the image
+        out (np.ndarray): array of at least the image's height and width, with the same number of channels, 
+                e.g. one slot of a preallocated (B,H,W,C) batch.
+
+    Returns:
+        np.ndarray: out
+    """
+    h, w = image.shape[:2]
+    if h > out.shape[0] or w > out.shape[1] or image.shape[2:] != out.shape[2:]:
+        raise ValueError(f"Image of shape {image.shape} does not fit in out of shape {out.shape}")
+    out[:h, :w] = image
+    out[h:] = 0
+    out[:h, w:] = 0
+    return out
@@ -0,0 +1,66 @@
+import gzip
+import json
+from typing import Callable, Dict
+
+
+class JsonCodec():
+
+    def __init__(self, loads: Callable[[bytes], any], dumps: Callable[[any], bytes], name: str = "custom"):
+        """JSON backend used by Client.get and Client.post.
+
+        Args:
+            loads (Callable[[bytes], any]): parse a utf-8 json document
+            dumps (Callable[[any], bytes]): serialize to a utf-8 json document
+            name (str, optional): for display. Defaults to "custom".
+        """
+        self.loads = loads
+        self.dumps = dumps
+        self.name = name
+
+    def __repr__(self) -> str:
+        return f"JsonCodec({self.name})"
+
+    @classmethod
+    def stdlib(cls) -> "JsonCodec":
+        return cls(json.loads, lambda obj: json.dumps(obj, separators=(",", ":")).encode(), "json")
+
+    @classmethod
+    def orjson(cls) -> "JsonCodec":
+        import orjson
+        return cls(orjson.loads, orjson.dumps, "orjson")
+
+    @classmethod
+    def default(cls) -> "JsonCodec":
+        """orjson if it is installed (pip install projectkiwi3[fast]), otherwise the standard library
+        """
+        try:
+            return cls.orjson()
+        except ImportError:
+            return cls.stdlib()
+
+
+def _zstdCompress(body: bytes) -> bytes:
+    import zstandard
+    return zstandard.ZstdCompressor(level=3).compress(body)
+
+
+# Content-Encoding -> compress function
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {
+    'gzip': lambda body: gzip.compress(body, compresslevel=6),
+    'zstd': _zstdCompress,
+}
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a request body.
+
+    Args:
+        body (bytes): the body
+        encoding (str): gzip, or zstd which needs the zstandard package
+
+    Returns:
+        bytes: compressed body, to be sent with a Content-Encoding: encoding header
+    """
+    if encoding not in COMPRESSORS:
+        raise ValueError(f"Unsupported request compression {encoding!r}, must be one of: {list(COMPRESSORS)}")
+    return COMPRESSORS[encoding](body)
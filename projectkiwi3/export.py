@@ -0,0 +1,150 @@
+import io
+import os
+import json
+import tarfile
+import numpy as np
+from typing import Dict, Iterator, List, Tuple, Union
+from projectkiwi3.models import LabelingQueue, LabelingTask, LabelingQueueRecord
+from projectkiwi3.geo import TaskGeoTransform
+from projectkiwi3.index import AnnotationIndex
+
+
+INDEX_NAME = "index.json"
+
+
+def _addMember(tar: tarfile.TarFile, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def _writeJson(path: str, data: dict):
+    tmpPath = path + ".tmp"
+    with open(tmpPath, "w") as f:
+        json.dump(data, f)
+    os.replace(tmpPath, path)
+
+
+def taskAnnotations(task: LabelingTask, image: np.ndarray, annotations: AnnotationIndex, padding_factor: float = None) -> List[dict]:
+    """Annotations intersecting a task, with coordinates projected into the task image in pixels.
+
+    Args:
+        task (LabelingTask): the task
+        image (np.ndarray): the image for the task
+        annotations (AnnotationIndex): index over the project annotations
+        padding_factor (float, optional): padding used to get the image
+
+    Returns:
+        List[dict]: id, labelId, confidence, shape and pixels ([[x, y], [x, y]]) for each annotation
+    """
+    transform = TaskGeoTransform(task.coordinates, image.shape[1], image.shape[0], padding_factor=padding_factor)
+    table = annotations.table
+    return [{
+        'id': table.ids[row].item(),
+        'labelId': table.labelIds[row].item(),
+        'confidence': table.confidences[row].item(),
+        'shape': table[row].shape,
+        'pixels': transform.lngLatToPixel(table.coordinates(row)).tolist()
+    } for row in annotations.query(task)]
+
+
+def exportQueue(client, 
+                imageryId: int, 
+                tasks: Union[List[LabelingTask], LabelingQueue], 
+                directory: str,
+                annotations: AnnotationIndex = None,
+                shard_size: int = 1000,
+                max_size: int = 1024,
+                padding_factor: float = None,
+                max_workers: int = 8) -> dict:
+    """Export the images for a labeling queue, and optionally their annotations, to a few large tar shards.
+
+    Each shard holds {taskId}.npy (the image) and {taskId}.json (the task and its annotations in pixel coordinates)
+    for up to shard_size tasks, so training can read them sequentially. index.json lists the tasks in each shard. 
+    Shards are only listed once completely written, re-running the same export skips them and 
+    retries shards with failed tasks or whose tasks have changed.
+
+    Args:
+        client (Client): client to fetch images with
+        imageryId (int): Id of Imagery layer to extract images from
+        tasks (Union[List[LabelingTask], LabelingQueue]): Tasks, or a labeling queue to export all tasks from
+        directory (str): Folder for the shards and index, created if missing
+        annotations (AnnotationIndex, optional): Index from Client.getAnnotationIndex, to include annotations in each task.
+        shard_size (int, optional): Tasks per shard. Defaults to 1000.
+        max_size (int, optional): maximum width for each image. Defaults to 1024.
+        padding_factor (float, optional): How much space to pad on each size. e.g. 0.2 will add 20% to each side
+        max_workers (int, optional): Number of concurrent requests. Defaults to 8.
+
+    Returns:
+        dict: the index, with the shards written so far and any failed task ids
+    """
+    if isinstance(tasks, (LabelingQueue, LabelingQueueRecord)):
+        tasks = tasks.labelingTasks
+    os.makedirs(directory, exist_ok=True)
+    indexPath = os.path.join(directory, INDEX_NAME)
+
+    settings = {'imageryId': imageryId, 'shardSize': shard_size, 'maxSize': max_size, 'paddingFactor': padding_factor}
+    index = {**settings, 'shards': {}}
+    if os.path.exists(indexPath):
+        with open(indexPath) as f:
+            previous = json.load(f)
+        if all(previous.get(key) == value for key, value in settings.items()):
+            index = previous
+
+    shards: Dict[str, List[LabelingTask]] = {}
+    for i, start in enumerate(range(0, len(tasks), shard_size)):
+        name = f"shard-{i:05d}.tar"
+        shardTasks = tasks[start:start + shard_size]
+        done = index['shards'].get(name)
+        # only skip a shard written for these same tasks, the queue may have changed since
+        if (done and not done['failed'] and os.path.exists(os.path.join(directory, name))
+                and sorted(done['taskIds'] + done['failed']) == sorted(task.id for task in shardTasks)):
+            continue
+        shards[name] = shardTasks
+
+    # fetch every pending task in one concurrent stream, writing shards in order as their tasks arrive
+    pending = [task for shardTasks in shards.values() for task in shardTasks]
+    images = client.getImagesForTasks(imageryId, pending, max_size=max_size, padding_factor=padding_factor, max_workers=max_workers)
+    try:
+        for name, shardTasks in shards.items():
+            path = os.path.join(directory, name)
+            written, failed = [], []
+            with tarfile.open(path + ".tmp", "w") as tar:
+                for task, image in (next(images) for _ in shardTasks):
+                    if isinstance(image, Exception):
+                        failed.append(task.id)
+                        continue
+                    buffer = io.BytesIO()
+                    np.save(buffer, image, allow_pickle=False)
+                    _addMember(tar, f"{task.id}.npy", buffer.getvalue())
+                    meta = {'task': {'id': task.id, 'coordinates': task.coordinates}}
+                    if annotations is not None:
+                        meta['annotations'] = taskAnnotations(task, image, annotations, padding_factor)
+                    _addMember(tar, f"{task.id}.json", json.dumps(meta).encode())
+                    written.append(task.id)
+            os.replace(path + ".tmp", path)
+            index['shards'][name] = {'taskIds': written, 'failed': failed}
+            _writeJson(indexPath, index)
+    finally:
+        images.close()
+    return index
+
+
+def readShard(path: str) -> Iterator[Tuple[int, np.ndarray, dict]]:
+    """Read an exported shard sequentially.
+
+    Args:
+        path (str): path to a shard written by exportQueue
+
+    Yields:
+        Tuple[int, np.ndarray, dict]: (task id, image, metadata with the task and its annotations)
+    """
+    with tarfile.open(path, "r") as tar:
+        image = None
+        for member in tar:
+            data = tar.extractfile(member).read()
+            if member.name.endswith(".npy"):
+                image = np.load(io.BytesIO(data), allow_pickle=False)
+            else:
+                meta = json.loads(data)
+                yield meta['task']['id'], image, meta
@@ -0,0 +1,131 @@
+import numpy as np
+from typing import List, Tuple
+from projectkiwi3.models import LabelingTask
+
+
+def padPolygon(coordinates: List[List[float]], padding_factor: float) -> List[List[float]]:
+    """Grow a polygon by padding_factor on each side, scaling about the centre of its bounds.
+    Equivalent to shapely.affinity.scale(polygon, 1 + 2 * padding_factor, 1 + 2 * padding_factor).
+
+    Args:
+        coordinates (List[List[float]]): coordinates in [[lng,lat], [lng,lat]] format
+        padding_factor (float): How much space to pad on each size. e.g. 0.2 will add 20% to each side
+
+    Returns:
+        List[List[float]]: the closed, padded polygon in [[lng,lat], [lng,lat]] format
+    """
+    coords = np.asarray(coordinates, dtype=np.float64)
+    centre = (coords.min(axis=0) + coords.max(axis=0)) / 2
+    padded = centre + (coords - centre) * (1 + (2 * padding_factor))
+    if not np.array_equal(padded[0], padded[-1]):
+        padded = np.concatenate([padded, padded[:1]])
+    return padded.tolist()
+
+
+def lngLatToMercator(lnglat: np.ndarray) -> np.ndarray:
+    """Web Mercator (EPSG:3857) x, y in metres for [lng, lat] in degrees"""
+    lnglat = np.asarray(lnglat, dtype=np.float64)
+    x = np.radians(lnglat[..., 0]) * 6378137.0
+    y = np.log(np.tan(np.pi / 4 + np.radians(lnglat[..., 1]) / 2)) * 6378137.0
+    return np.stack([x, y], axis=-1)
+
+
+def mercatorToLngLat(xy: np.ndarray) -> np.ndarray:
+    """[lng, lat] in degrees for Web Mercator (EPSG:3857) x, y in metres"""
+    xy = np.asarray(xy, dtype=np.float64)
+    lng = np.degrees(xy[..., 0] / 6378137.0)
+    lat = np.degrees(2 * np.arctan(np.exp(xy[..., 1] / 6378137.0)) - np.pi / 2)
+    return np.stack([lng, lat], axis=-1)
+
+
+class TaskGeoTransform():
+
+    def __init__(self, 
+                 taskCoordinates: List[List[float]], 
+                 width: float = 1, 
+                 height: float = 1, 
+                 padding_factor: float = None, 
+                 mercator: bool = False):
+        """Mapping between pixels in the image for a task and lng, lat. Build it once per task and reuse it,
+        the task bounds and padding are only computed here.
+
+        Pixel (0, 0) is the top left (north west) corner of the image, (width, height) the bottom right.
+
+        Args:
+            taskCoordinates (List[List[float]]): Coordinates for the task in [[lng, lat], [lng, lat]] format
+            width (float, optional): Image width in pixels. Defaults to 1, i.e. normalised coordinates.
+            height (float, optional): Image height in pixels. Defaults to 1, i.e. normalised coordinates.
+            padding_factor (float, optional): If a padding factor was used to get the task image, it must be supplied here
+            mercator (bool, optional): Interpolate in Web Mercator rather than linearly in lng, lat. 
+                    More accurate for large tasks, since the image is north up in Web Mercator. Defaults to False.
+        """
+        coords = np.asarray(taskCoordinates, dtype=np.float64)
+        west, south = coords.min(axis=0)
+        east, north = coords.max(axis=0)
+
+        if padding_factor:
+            # scaling the polygon about the centre of its bounds scales the bounds themselves
+            cx, cy = (west + east) / 2, (south + north) / 2
+            scale = 1 + (2 * padding_factor)
+            west, east = cx + (west - cx) * scale, cx + (east - cx) * scale
+            south, north = cy + (south - cy) * scale, cy + (north - cy) * scale
+
+        self.bounds: Tuple[float, float, float, float] = (west.item(), south.item(), east.item(), north.item())
+        self.width = width
+        self.height = height
+        self.padding_factor = padding_factor
+        self.mercator = mercator
+
+        # pixel = (world - origin) * scale, in lng, lat or mercator metres
+        topLeft = np.array([[west, north]])
+        bottomRight = np.array([[east, south]])
+        if mercator:
+            topLeft, bottomRight = lngLatToMercator(topLeft), lngLatToMercator(bottomRight)
+        self._origin = topLeft[0]
+        self._scale = np.array([width, height]) / (bottomRight[0] - topLeft[0])
+
+    @classmethod
+    def fromTask(cls, task: LabelingTask, width: float = 1, height: float = 1, padding_factor: float = None, mercator: bool = False) -> "TaskGeoTransform":
+        """Transform for a labeling task, see TaskGeoTransform.
+
+        Returns:
+            TaskGeoTransform: The transform
+        """
+        return cls(task.coordinates, width=width, height=height, padding_factor=padding_factor, mercator=mercator)
+
+    def withSize(self, width: float, height: float) -> "TaskGeoTransform":
+        """The same transform for an image of a different size, e.g. once the image has been fetched.
+
+        Returns:
+            TaskGeoTransform: The transform
+        """
+        transform = TaskGeoTransform.__new__(TaskGeoTransform)
+        transform.__dict__.update(self.__dict__)
+        transform.width = width
+        transform.height = height
+        transform._scale = self._scale * np.array([width / self.width, height / self.height])
+        return transform
+
+    def pixelToLngLat(self, pixels: np.ndarray) -> np.ndarray:
+        """Convert pixel coordinates to lng, lat.
+
+        Args:
+            pixels (np.ndarray): (..., 2) array of [x, y] in pixels
+
+        Returns:
+            np.ndarray: (..., 2) array of [lng, lat]
+        """
+        world = self._origin + np.asarray(pixels, dtype=np.float64) / self._scale
+        return mercatorToLngLat(world) if self.mercator else world
+
+    def lngLatToPixel(self, lnglat: np.ndarray) -> np.ndarray:
+        """Convert lng, lat to pixel coordinates, e.g. to project annotations into the task image.
+
+        Args:
+            lnglat (np.ndarray): (..., 2) array of [lng, lat]
+
+        Returns:
+            np.ndarray: (..., 2) array of [x, y] in pixels, outside [0, width] x [0, height] if outside the image
+        """
+        world = lngLatToMercator(lnglat) if self.mercator else np.asarray(lnglat, dtype=np.float64)
+        return (world - self._origin) * self._scale
@@ -0,0 +1,94 @@
+import numpy as np
+import shapely
+from typing import List, Union
+from projectkiwi3.models import Annotation, LabelingTask
+from projectkiwi3.table import AnnotationTable, SHAPES
+
+
+PolygonLike = Union[List[List[float]], LabelingTask, shapely.Geometry]
+
+
+def toGeometry(polygon: PolygonLike) -> shapely.Geometry:
+    """Shapely polygon for task coordinates in [[lng, lat], [lng, lat]] format, a LabelingTask or a shapely geometry"""
+    if isinstance(polygon, shapely.Geometry):
+        return polygon
+    if isinstance(polygon, LabelingTask) or hasattr(polygon, "coordinates"):
+        polygon = polygon.coordinates
+    return shapely.Polygon(polygon)
+
+
+class AnnotationIndex():
+
+    def __init__(self, table: AnnotationTable, labelIds: List[int] = None):
+        """Spatial index (STR-tree) over annotations, for finding the annotations within tasks.
+
+        Args:
+            table (AnnotationTable): Annotations to index e.g. from Client.getAnnotationTable
+            labelIds (List[int], optional): Only index annotations with these labels.
+        """
+        if labelIds is not None:
+            table = table.filter(labelIds=labelIds)
+        self.table = table
+
+        # build geometries for each shape type in one vectorized call
+        self.geometries = np.empty(len(table), dtype=object)
+        counts = np.diff(table.offsets)
+        for code, shape in enumerate(SHAPES):
+            rows = np.flatnonzero(table.shapes == code)
+            if not len(rows):
+                continue
+            subset = table.take(rows)
+            if shape == "Point":
+                self.geometries[rows] = shapely.points(subset.vertices[subset.offsets[:-1]])
+                continue
+            parts = np.repeat(np.arange(len(rows)), counts[rows])
+            if shape == "Polygon":
+                self.geometries[rows] = shapely.polygons(shapely.linearrings(subset.vertices, indices=parts))
+            else:
+                self.geometries[rows] = shapely.linestrings(subset.vertices, indices=parts)
+
+        self.tree = shapely.STRtree(self.geometries)
+
+    @classmethod
+    def fromAnnotations(cls, annotations: List[Annotation], labelIds: List[int] = None) -> "AnnotationIndex":
+        """Build an index from Annotation objects e.g. from Client.getAnnotations.
+
+        Returns:
+            AnnotationIndex: The index
+        """
+        return cls(AnnotationTable.from_annotations(annotations), labelIds)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def query(self, polygon: PolygonLike, predicate: str = "intersects") -> np.ndarray:
+        """Annotations matching a polygon.
+
+        Args:
+            polygon (PolygonLike): coordinates in [[lng, lat], [lng, lat]] format, a LabelingTask or a shapely geometry
+            predicate (str, optional): shapely predicate the annotation must satisfy with respect to the polygon,
+                    e.g. "intersects" or "contains" (polygon contains annotation). Defaults to "intersects".
+
+        Returns:
+            np.ndarray: sorted row indices into self.table, use self.table[rows] for the annotations
+        """
+        return np.sort(self.tree.query(toGeometry(polygon), predicate=predicate))
+
+    def query_many(self, polygons: List[PolygonLike], predicate: str = "intersects") -> List[np.ndarray]:
+        """Annotations matching each of many polygons, in a single bulk tree query.
+
+        Args:
+            polygons (List[PolygonLike]): e.g. every task in a labeling queue
+            predicate (str, optional): see query. Defaults to "intersects".
+
+        Returns:
+            List[np.ndarray]: sorted row indices into self.table, one array per polygon
+        """
+        geometries = np.array([toGeometry(polygon) for polygon in polygons], dtype=object)
+        if not len(geometries):
+            return []
+        polygonIndex, rows = self.tree.query(geometries, predicate=predicate)
+        order = np.lexsort((rows, polygonIndex))
+        polygonIndex, rows = polygonIndex[order], rows[order]
+        splits = np.searchsorted(polygonIndex, np.arange(1, len(geometries)))
+        return np.split(rows, splits)
@@ -0,0 +1,167 @@
+import time
+import queue
+import threading
+import numpy as np
+from typing import Iterator, List, Tuple, Union
+from pydantic import BaseModel
+from projectkiwi3.models import LabelingQueue, LabelingTask, LabelingQueueRecord
+from projectkiwi3.chips import copyInto
+
+
+class LoaderStats(BaseModel):
+    fetched: int = 0 # images fetched
+    failed: int = 0 # tasks whose image could not be fetched, see TaskLoader.errors
+    batches: int = 0
+    queueDepth: int = 0 # images currently prefetched and waiting
+    stalls: int = 0 # times the consumer found no image ready
+    stallTime: float = 0.0 # seconds the consumer spent waiting for images
+
+
+class TaskLoader():
+
+    def __init__(self, client, 
+                 imageryId: int, 
+                 tasks: Union[List[LabelingTask], LabelingQueue], 
+                 batch_size: int = 16, 
+                 prefetch: int = 64,
+                 max_workers: int = 8,
+                 max_size: int = 1024,
+                 padding_factor: float = None,
+                 shape: Tuple[int, ...] = None,
+                 ordered: bool = True,
+                 drop_last: bool = False):
+        """Iterate over batches of task images, fetched in the background while the previous batches are used, 
+        e.g. for model inference. 
+
+        If stats.stallTime grows the consumer is waiting on the network, increase prefetch or max_workers.
+
+        Args:
+            client (Client): client to fetch images with
+            imageryId (int): Id of Imagery layer to extract images from
+            tasks (Union[List[LabelingTask], LabelingQueue]): Tasks, or a labeling queue to use all tasks from
+            batch_size (int, optional): Images per batch. Defaults to 16.
+            prefetch (int, optional): Maximum number of images fetched ahead of the consumer. Defaults to 64.
+            max_workers (int, optional): Number of concurrent requests. Defaults to 8.
+            max_size (int, optional): maximum width for each image. Defaults to 1024.
+            padding_factor (float, optional): How much space to pad on each size. e.g. 0.2 will add 20% to each side
+            shape (Tuple[int, ...], optional): (H,W,C) to yield batches as one (B,H,W,C) array, images are placed
+                    in the top left corner of each slot. Otherwise batches are lists of arrays.
+            ordered (bool, optional): Keep the order of tasks, otherwise images are batched as they arrive. Defaults to True.
+            drop_last (bool, optional): Drop the final batch if smaller than batch_size. Defaults to False.
+        """
+        if isinstance(tasks, (LabelingQueue, LabelingQueueRecord)):
+            tasks = tasks.labelingTasks
+        self.client = client
+        self.imageryId = imageryId
+        self.tasks = tasks
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        self.max_workers = max_workers
+        self.max_size = max_size
+        self.padding_factor = padding_factor
+        self.shape = shape
+        self.ordered = ordered
+        self.drop_last = drop_last
+        self.stats = LoaderStats()
+        self.errors: List[Tuple[LabelingTask, Exception]] = []
+        self._queue: queue.Queue = None
+
+    def __len__(self) -> int:
+        """Number of batches"""
+        if self.drop_last:
+            return len(self.tasks) // self.batch_size
+        return -(-len(self.tasks) // self.batch_size)
+
+    def _produce(self, results: queue.Queue, stop: threading.Event):
+        images = self.client.getImagesForTasks(self.imageryId, self.tasks, 
+                                               max_size=self.max_size, 
+                                               padding_factor=self.padding_factor,
+                                               max_workers=self.max_workers,
+                                               ordered=self.ordered)
+        try:
+            for item in images:
+                while not stop.is_set():
+                    try:
+                        results.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+        except Exception as e: # failure outside of a single task, e.g. resolving the imagery url
+            results.put(e)
+        finally:
+            images.close()
+            results.put(None)
+
+    def _next(self, results: queue.Queue):
+        if results.empty():
+            self.stats.stalls += 1
+            start = time.perf_counter()
+            item = results.get()
+            self.stats.stallTime += time.perf_counter() - start
+            return item
+        return results.get()
+
+    def _batch(self, tasks: List[LabelingTask], images: List[np.ndarray]) -> Tuple[Union[np.ndarray, List[np.ndarray]], List[LabelingTask]]:
+        self.stats.batches += 1
+        if self.shape is None:
+            return images, tasks
+        batch = np.empty((len(images), *self.shape), dtype=images[0].dtype)
+        for slot, image in zip(batch, images):
+            copyInto(image, slot)
+        return batch, tasks
+
+    def __iter__(self) -> Iterator[Tuple[Union[np.ndarray, List[np.ndarray]], List[LabelingTask]]]:
+        """Yields:
+            Tuple[Union[np.ndarray, List[np.ndarray]], List[LabelingTask]]: (images, tasks) for each batch
+        """
+        self.stats = LoaderStats()
+        self.errors = []
+        results = self._queue = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(results, stop), daemon=True, name="projectkiwi3-loader")
+        producer.start()
+
+        tasks, images = [], []
+        try:
+            while True:
+                item = self._next(results)
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                task, image = item
+                if isinstance(image, Exception):
+                    self.stats.failed += 1
+                    self.errors.append((task, image))
+                    continue
+                self.stats.fetched += 1
+                tasks.append(task)
+                images.append(image)
+                if len(images) == self.batch_size:
+                    yield self._batch(tasks, images)
+                    tasks, images = [], []
+            if images and not self.drop_last:
+                yield self._batch(tasks, images)
+        finally:
+            stop.set()
+            # unblock the producer if it is waiting on a full queue
+            while producer.is_alive():
+                try:
+                    results.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+
+    @property
+    def queueDepth(self) -> int:
+        """Images currently prefetched and waiting to be batched"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def snapshot(self) -> LoaderStats:
+        """Current statistics, including the queue depth.
+
+        Returns:
+            LoaderStats: copy of the statistics
+        """
+        return self.stats.model_copy(update={"queueDepth": self.queueDepth})
@@ -0,0 +1,181 @@
+import re
+import time
+import bisect
+import warnings
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, NamedTuple, Tuple
+
+
+# upper bounds in seconds, the last bucket is +Inf
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+PHASES = ("network", "parse", "build")
+
+
+def endpointName(method: str, url: str) -> str:
+    """Endpoint label for a request, with ids replaced so requests to the same endpoint are grouped
+    e.g. GET /api/project/{id}/annotations"""
+    path = re.sub(r"^[a-z]+://[^/]+", "", url).split("?")[0]
+    return f"{method} {re.sub(r'/[0-9]+(?=/|$)', '/{id}', path)}"
+
+
+class MetricEvent(NamedTuple):
+    endpoint: str # e.g. GET /api/project/{id}/annotations
+    phase: str # network (request and response), parse (json or image decode) or build (models)
+    seconds: float
+    status: int = 0 # http status, network phase only
+    requestBytes: int = 0
+    responseBytes: int = 0
+    retries: int = 0
+
+
+class Histogram():
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics():
+
+    def __init__(self):
+        """Timings, byte counts, retries and cache hit ratios for a Client, per endpoint.
+
+        Use addHook to receive every observation as it happens, snapshot for the totals so far,
+        or toPrometheus to export them in the Prometheus text format.
+        """
+        self._lock = threading.Lock()
+        self._hooks: List[Callable[[MetricEvent], None]] = []
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._cache: Dict[str, List[int]] = {} # name -> [hits, misses]
+
+    def addHook(self, hook: Callable[[MetricEvent], None]):
+        """Call hook with a MetricEvent for every observation. Hooks run on the requesting thread and should be fast.
+
+        Args:
+            hook (Callable[[MetricEvent], None]): the callback
+        """
+        self._hooks.append(hook)
+
+    def removeHook(self, hook: Callable[[MetricEvent], None]):
+        self._hooks.remove(hook)
+
+    def observe(self, event: MetricEvent):
+        """Record an observation and pass it to the hooks.
+
+        Args:
+            event (MetricEvent): the observation
+        """
+        with self._lock:
+            key = (event.endpoint, event.phase)
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(event.seconds)
+            if event.phase == "network":
+                for name, value in [("requests", 1), 
+                                    ("errors", int(event.status >= 400)), 
+                                    ("retries", event.retries),
+                                    ("requestBytes", event.requestBytes), 
+                                    ("responseBytes", event.responseBytes)]:
+                    self._counters[(event.endpoint, name)] = self._counters.get((event.endpoint, name), 0) + value
+        for hook in self._hooks:
+            try:
+                hook(event)
+            except Exception as e:
+                warnings.warn(f"projectkiwi3 metrics hook failed: {e!r}")
+
+    @contextmanager
+    def timer(self, endpoint: str, phase: str):
+        """Time the body of a with block as one observation.
+
+        Args:
+            endpoint (str): endpoint name, see endpointName
+            phase (str): one of PHASES
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(MetricEvent(endpoint, phase, time.perf_counter() - start))
+
+    def observeCache(self, name: str, hit: bool):
+        """Record a cache lookup.
+
+        Args:
+            name (str): cache name e.g. chip
+            hit (bool): whether the lookup was a hit
+        """
+        with self._lock:
+            counts = self._cache.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def snapshot(self) -> dict:
+        """Totals so far.
+
+        Returns:
+            dict: {"endpoints": {endpoint: {"requests", "errors", "retries", "requestBytes", "responseBytes", 
+                   "network"|"parse"|"build": {"count", "sum", "buckets"}}}, 
+                   "caches": {name: {"hits", "misses", "hitRatio"}}}
+        """
+        with self._lock:
+            endpoints: Dict[str, dict] = {}
+            for (endpoint, name), value in self._counters.items():
+                endpoints.setdefault(endpoint, {})[name] = value
+            for (endpoint, phase), histogram in self._histograms.items():
+                endpoints.setdefault(endpoint, {})[phase] = {
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'buckets': dict(zip([*BUCKETS, float("inf")], histogram.counts)),
+                }
+            caches = {name: {'hits': hits, 'misses': misses, 'hitRatio': hits / (hits + misses) if hits + misses else 0.0}
+                      for name, (hits, misses) in self._cache.items()}
+        return {'endpoints': endpoints, 'caches': caches}
+
+    def toPrometheus(self, prefix: str = "projectkiwi3") -> str:
+        """Metrics in the Prometheus text exposition format.
+
+        Args:
+            prefix (str, optional): metric name prefix. Defaults to "projectkiwi3".
+
+        Returns:
+            str: the metrics
+        """
+        snapshot = self.snapshot()
+        lines = [f"# HELP {prefix}_request_seconds Time per endpoint and phase (network, parse, build)",
+                 f"# TYPE {prefix}_request_seconds histogram"]
+        for endpoint, values in sorted(snapshot['endpoints'].items()):
+            for phase in PHASES:
+                if phase not in values:
+                    continue
+                labels = f'endpoint="{endpoint}",phase="{phase}"'
+                cumulative = 0
+                for bound, count in values[phase]['buckets'].items():
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{prefix}_request_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"{prefix}_request_seconds_sum{{{labels}}} {values[phase]['sum']}")
+                lines.append(f"{prefix}_request_seconds_count{{{labels}}} {values[phase]['count']}")
+
+        for name, metric, help in [("requests", "requests_total", "Requests sent"),
+                                   ("errors", "request_errors_total", "Requests that failed with an http error"),
+                                   ("retries", "retries_total", "Retries after connection errors or 5xx responses"),
+                                   ("requestBytes", "request_bytes_total", "Request body bytes sent"),
+                                   ("responseBytes", "response_bytes_total", "Response body bytes received")]:
+            lines += [f"# HELP {prefix}_{metric} {help}", f"# TYPE {prefix}_{metric} counter"]
+            for endpoint, values in sorted(snapshot['endpoints'].items()):
+                if name in values:
+                    lines.append(f'{prefix}_{metric}{{endpoint="{endpoint}"}} {values[name]}')
+
+        for name, metric in [("hits", "cache_hits_total"), ("misses", "cache_misses_total")]:
+            lines += [f"# HELP {prefix}_{metric} Cache {name}", f"# TYPE {prefix}_{metric} counter"]
+            for cache, values in sorted(snapshot['caches'].items()):
+                lines.append(f'{prefix}_{metric}{{cache="{cache}"}} {values[name]}')
+        return "\n".join(lines) + "\n"
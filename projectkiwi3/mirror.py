@@ -0,0 +1,160 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+from projectkiwi3.models import Project, Label, Annotation, LabelingQueue, Imagery
+from projectkiwi3.models import AnnotationRecord, LabelRecord, LabelingQueueRecord, LabelRegistry
+from projectkiwi3.table import AnnotationTable
+
+
+# table name -> api path for the project, relative to {url}/api/project/{projectId}
+COLLECTIONS = {
+    "labels": "/labels",
+    "annotations": "/annotations",
+    "labelingQueues": "/labelingQueue",
+    "imagery": "/imagery",
+}
+
+
+class ProjectMirror():
+
+    def __init__(self, client, projectId: int, path: str):
+        """Local SQLite copy of a project, its labels, annotations, labeling queues and imagery.
+
+        Reads are served from the local file. refresh() brings it up to date, only records whose 
+        content changed since the last sync are written, and records deleted on the server are removed.
+
+        Args:
+            client (Client): client used to refresh the mirror
+            projectId (int): The ID of the project e.g. 869
+            path (str): SQLite file to keep the mirror in, created if missing
+        """
+        self.client = client
+        self.projectId = projectId
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            for table in ["project", *COLLECTIONS]:
+                self._db.execute(f"""CREATE TABLE IF NOT EXISTS {table} (
+                    projectId INTEGER, id INTEGER, modifiedAt TEXT, data TEXT, digest TEXT, PRIMARY KEY (projectId, id))""")
+                # mirrors created before digests were stored, their records are rewritten on the next refresh
+                if "digest" not in [column[1] for column in self._db.execute(f"PRAGMA table_info({table})")]:
+                    self._db.execute(f"ALTER TABLE {table} ADD COLUMN digest TEXT")
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def lastSync(self) -> float:
+        """Unix time of the last refresh, 0 if never refreshed"""
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (f"lastSync/{self.projectId}",)).fetchone()
+        return float(row[0]) if row else 0.0
+
+    def _sync(self, table: str, records: Iterable[dict]) -> Tuple[int, int]:
+        """Upsert changed records and delete missing ones, returns (changed, deleted)
+        """
+        # compare content rather than modifiedAt, which e.g. a labeling queue keeps when its tasks change
+        known: Dict[int, str] = dict(self._db.execute(
+            f"SELECT id, digest FROM {table} WHERE projectId = ?", (self.projectId,)))
+        changed = 0
+        batch = []
+        for data in records:
+            id = data['id']
+            serialized = json.dumps(data, sort_keys=True)
+            digest = hashlib.sha1(serialized.encode()).hexdigest()
+            if known.pop(id, None) == digest:
+                continue
+            batch.append((self.projectId, id, data.get('modifiedAt'), serialized, digest))
+            if len(batch) >= 10000:
+                changed += self._upsert(table, batch)
+                batch = []
+        changed += self._upsert(table, batch)
+
+        # anything not returned by the server has been deleted
+        self._db.executemany(f"DELETE FROM {table} WHERE projectId = ? AND id = ?", 
+                             [(self.projectId, id) for id in known])
+        return changed, len(known)
+
+    def _upsert(self, table: str, batch: List[tuple]) -> int:
+        self._db.executemany(f"INSERT OR REPLACE INTO {table} (projectId, id, modifiedAt, data, digest) VALUES (?, ?, ?, ?, ?)", batch)
+        return len(batch)
+
+    def refresh(self, max_age: float = 0) -> Dict[str, Tuple[int, int]]:
+        """Bring the mirror up to date with the server.
+
+        Args:
+            max_age (float, optional): Skip the refresh if the last one was less than max_age seconds ago. Defaults to 0.
+
+        Returns:
+            Dict[str, Tuple[int, int]]: (changed, deleted) record counts for each table, empty if skipped
+        """
+        if time.time() - self.lastSync < max_age:
+            return {}
+
+        base = f"{self.client.url}/api/project/{self.projectId}"
+        counts = {}
+        with self._lock, self._db:
+            counts["project"] = self._sync("project", [self.client.get(base)])
+            for table, path in COLLECTIONS.items():
+                # stream so even very large projects are synced in constant memory
+                counts[table] = self._sync(table, self.client.iterGet(base + path))
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (f"lastSync/{self.projectId}", str(time.time())))
+        return counts
+
+    def _rows(self, table: str) -> Iterator[dict]:
+        for (data,) in self._db.execute(f"SELECT data FROM {table} WHERE projectId = ? ORDER BY id", (self.projectId,)):
+            yield json.loads(data)
+
+    def getProject(self) -> Project:
+        """See Client.getProject"""
+        for data in self._rows("project"):
+            return Project.from_dict(data)
+        raise KeyError(f"Project {self.projectId} has not been synced, call refresh() first")
+
+    def getLabels(self, trusted: bool = False) -> List[Label]:
+        """See Client.getLabels"""
+        model = LabelRecord if trusted else Label
+        return [model.from_dict(data) for data in self._rows("labels")]
+
+    def iterAnnotations(self, trusted: bool = False) -> Iterator[Annotation]:
+        """See Client.iterAnnotations"""
+        model = AnnotationRecord if trusted else Annotation
+        registry = LabelRegistry(LabelRecord if trusted else Label)
+        for data in self._rows("annotations"):
+            yield model.from_dict(data, registry)
+
+    def getAnnotations(self, trusted: bool = False) -> List[Annotation]:
+        """See Client.getAnnotations"""
+        return list(self.iterAnnotations(trusted))
+
+    def getAnnotationTable(self) -> AnnotationTable:
+        """See Client.getAnnotationTable"""
+        return AnnotationTable.from_json(self._rows("annotations"))
+
+    def getLabelingQueues(self, trusted: bool = False) -> List[LabelingQueue]:
+        """See Client.getLabelingQueues"""
+        model = LabelingQueueRecord if trusted else LabelingQueue
+        return [model.from_dict(data) for data in self._rows("labelingQueues")]
+
+    def getLabelingQueue(self, id: int, trusted: bool = False) -> Union[LabelingQueue, LabelingQueueRecord]:
+        """See Client.getLabelingQueue"""
+        row = self._db.execute("SELECT data FROM labelingQueues WHERE projectId = ? AND id = ?", (self.projectId, id)).fetchone()
+        if row is None:
+            raise KeyError(f"Labeling queue {id} is not in the mirror")
+        model = LabelingQueueRecord if trusted else LabelingQueue
+        return model.from_dict(json.loads(row[0]))
+
+    def getAllImagery(self) -> List[Imagery]:
+        """See Client.getAllImagery"""
+        return [Imagery.from_dict(data) for data in self._rows("imagery")]
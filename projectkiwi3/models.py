@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, NamedTuple, Dict, Tuple, Union
 import json
 
 
@@ -60,9 +60,7 @@ class LabelingTask(BaseModel):
 
     @classmethod
     def from_dict(cls, data: dict):
-        coords = []
-        for coord in data['taskCoordinates']:
-            coords.append([coord['lng'], coord['lat']])
+        coords = [[coord['lng'], coord['lat']] for coord in data['taskCoordinates']]
         return cls(
             id = data['id'],
             complete = data['complete'],
@@ -164,10 +162,8 @@ class Annotation(BaseModel):
 
 
     @classmethod
-    def from_dict(cls, data: dict):
-        coords = []
-        for coord in data['coordinates']:
-            coords.append([coord['lng'], coord['lat']])
+    def from_dict(cls, data: dict, labels: "LabelRegistry" = None):
+        coords = [[coord['lng'], coord['lat']] for coord in data['coordinates']]
         return cls(
             id = data['id'],
             sub = data['sub'],
@@ -175,7 +171,7 @@ class Annotation(BaseModel):
             createdAt = data['createdAt'],
             confidence = data['confidence'],
             labelId = data['labelId'],
-            label = Label.from_dict(data['label']),
+            label = labels.resolve(data) if labels is not None else Label.from_dict(data['label']),
             modifiedAt = data['modifiedAt'],
             coordinates = coords
         )
@@ -195,6 +191,18 @@ class AnnotationPayload(BaseModel):
                 'confidence': self.confidence
             }
 
+
+
+class UploadResult(BaseModel):
+    annotations: List[Annotation] # created by this call, in payload order
+    succeededChunks: List[int]
+    failedChunks: Dict[int, str] # chunk index -> error
+    resumeToken: str # pass to Client.uploadAnnotations to send only the chunks still missing
+
+    @property
+    def complete(self) -> bool:
+        return not self.failedChunks
+
     
 # model Project {
 #   id              Int              @id @default(autoincrement())
@@ -235,3 +243,146 @@ class Project(BaseModel):
             labels = [Label.from_dict(labelDict) for labelDict in data['labels']] \
                     if 'labels' in data else None
         )
+
+
+
+# Lightweight records for trusted api responses. These skip pydantic validation entirely and
+# use several times less time and memory per object, use toModel() to get the full model back.
+class LabelRecord(NamedTuple):
+    id: int
+    name: str
+    color: str
+    active: bool
+    modifiedAt: str
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data['id'], data['name'], data['color'], data['active'], data['modifiedAt'])
+
+    def toModel(self) -> Label:
+        return Label(**self._asdict())
+
+
+class AnnotationRecord(NamedTuple):
+    id: int
+    sub: str
+    shape: str
+    createdAt: str
+    confidence: float
+    labelId: int
+    label: LabelRecord
+    modifiedAt: str
+    coordinates: List[List[float]] # [[lng, lat], [lng,lat]]
+
+    @classmethod
+    def from_dict(cls, data: dict, labels: "LabelRegistry" = None):
+        return cls(
+            data['id'],
+            data['sub'],
+            data['shape'],
+            data['createdAt'],
+            data['confidence'],
+            data['labelId'],
+            labels.resolve(data) if labels is not None else LabelRecord.from_dict(data['label']),
+            data['modifiedAt'],
+            [[coord['lng'], coord['lat']] for coord in data['coordinates']]
+        )
+
+    def toModel(self) -> Annotation:
+        return Annotation(**self._replace(label=self.label.toModel())._asdict())
+
+
+class LabelingTaskRecord(NamedTuple):
+    id: int
+    complete: bool
+    completedBy: Optional[str]
+    coordinates: List[List[float]] # [[lng, lat], [lng,lat]]
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            data['id'],
+            data['complete'],
+            data['completedBy'],
+            [[coord['lng'], coord['lat']] for coord in data['taskCoordinates']]
+        )
+
+    def toModel(self) -> LabelingTask:
+        return LabelingTask(**self._asdict())
+
+
+class LabelingQueueRecord(NamedTuple):
+    id: int
+    name: Optional[str]
+    createdBy: str
+    modifiedAt: str
+    labelingTasks: List[LabelingTaskRecord]
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            data['id'],
+            data['name'],
+            data['createdBy'],
+            data['modifiedAt'],
+            [LabelingTaskRecord.from_dict(dict) for dict in data['labelingTasks']]
+        )
+
+    def toModel(self) -> LabelingQueue:
+        return LabelingQueue(**self._replace(labelingTasks=[task.toModel() for task in self.labelingTasks])._asdict())
+
+
+
+class LabelRegistry():
+
+    def __init__(self, model: type = Label, known: List[Label] = None):
+        """Shares one label instance between all annotations with the same label, instead of 
+        building a copy from the label embedded in every annotation.
+
+        Args:
+            model (type, optional): Label or LabelRecord, used to build labels not already registered. Defaults to Label.
+            known (List[Label], optional): Labels e.g. from Client.getLabels. Annotations with one of these
+                    labelIds use it directly and their embedded label is not parsed at all. Labels or LabelRecords
+                    may be given either way, they are converted to model once here.
+        """
+        self.model = model
+        self.labels: Dict[Tuple[int, str], Label] = {}
+        self.known: Dict[int, Label] = {label.id: self._convert(label) for label in known or []}
+
+    def _convert(self, label: Union[Label, LabelRecord]) -> Union[Label, LabelRecord]:
+        if isinstance(label, self.model):
+            return label
+        if isinstance(label, LabelRecord):
+            return label.toModel()
+        if isinstance(label, Label):
+            return LabelRecord(**label.model_dump())
+        raise TypeError(f"Expected Label or LabelRecord, got {type(label).__name__}")
+
+    def get(self, data: dict) -> Label:
+        """Label for a label dict from the api, keyed on (id, modifiedAt).
+
+        Args:
+            data (dict): label dict
+
+        Returns:
+            Label: The shared label instance
+        """
+        key = (data['id'], data['modifiedAt'])
+        label = self.labels.get(key)
+        if label is None:
+            label = self.labels[key] = self.model.from_dict(data)
+        return label
+
+    def resolve(self, annotationData: dict) -> Label:
+        """Label for an annotation dict from the api.
+
+        Args:
+            annotationData (dict): annotation dict, with labelId and the embedded label
+
+        Returns:
+            Label: The shared label instance
+        """
+        label = self.known.get(annotationData['labelId'])
+        if label is None:
+            label = self.get(annotationData['label'])
+        return label
@@ -0,0 +1,191 @@
+import time
+import asyncio
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+# statuses meaning the server is overloaded and the request was not processed
+THROTTLE_STATUSES = (429, 503)
+
+
+def retryAfter(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header, which is either seconds or an http date
+
+    Args:
+        value (Optional[str]): the header value
+
+    Returns:
+        Optional[float]: seconds, or None if missing or invalid
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter():
+
+    def __init__(self, rate: float = None, 
+                 burst: int = None, 
+                 max_concurrency: int = 32, 
+                 min_concurrency: int = 1, 
+                 initial_concurrency: int = None,
+                 decrease: float = 0.5,
+                 cooldown: float = 1.0,
+                 default_backoff: float = 1.0):
+        """Limit requests to the rate the server will sustain, may be shared between clients, threads and event loops.
+
+        A token bucket caps requests per second. On top of that, the number of requests in flight adapts (AIMD):
+        it grows by about one per round of successful requests, and is cut by decrease when the server 
+        throttles (429 or 503). Retry-After is honoured by pausing all requests for that long.
+
+        Args:
+            rate (float, optional): Requests per second, None for no limit. Defaults to None.
+            burst (int, optional): Requests that may be sent at once after an idle period. Defaults to rate, at least 1.
+            max_concurrency (int, optional): Upper bound for requests in flight. Defaults to 32.
+            min_concurrency (int, optional): Lower bound for requests in flight. Defaults to 1.
+            initial_concurrency (int, optional): Starting limit. Defaults to max_concurrency.
+            decrease (float, optional): Factor the limit is multiplied by when throttled. Defaults to 0.5.
+            cooldown (float, optional): Seconds after a decrease during which further throttles don't decrease 
+                    the limit again, as they come from requests sent before the decrease. Defaults to 1.
+            default_backoff (float, optional): Seconds to pause when throttled without a Retry-After. Defaults to 1.
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, int(rate or 1))
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.default_backoff = default_backoff
+
+        self.limit = float(initial_concurrency or max_concurrency)
+        self.inflight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.decreases = 0
+        self.waitTime = 0.0
+        self._tokens = float(self.burst)
+        self._refilled = time.monotonic()
+        self._pausedUntil = 0.0
+        self._lastDecrease = float("-inf")
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    def _tryAcquire(self) -> Optional[float]:
+        """Take a slot and a token if possible, must hold the lock.
+
+        Returns:
+            Optional[float]: 0 if acquired, otherwise seconds to wait, or None to wait for a release
+        """
+        now = time.monotonic()
+        if now < self._pausedUntil:
+            return self._pausedUntil - now
+        if self.inflight >= max(1, int(self.limit)):
+            return None
+        if self.rate:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+            self._refilled = now
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate
+            self._tokens -= 1
+        self.inflight += 1
+        self.requests += 1
+        return 0
+
+    def acquire(self):
+        """Block until a request may be sent, every acquire must be followed by a release.
+        """
+        start = time.monotonic()
+        with self._lock:
+            while True:
+                wait = self._tryAcquire()
+                if wait == 0:
+                    break
+                self._released.wait(wait)
+            self.waitTime += time.monotonic() - start
+
+    async def acquireAsync(self):
+        """acquire for coroutines, waits without blocking the event loop.
+        """
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                wait = self._tryAcquire()
+                if wait == 0:
+                    self.waitTime += time.monotonic() - start
+                    return
+            # releases may come from other threads, so poll rather than wait on an asyncio primitive
+            await asyncio.sleep(0.005 if wait is None else wait)
+
+    def release(self, status: int = 200, retry_after: float = None):
+        """Report the outcome of a request and free its slot.
+
+        Args:
+            status (int, optional): http status of the response, 0 for connection errors. Defaults to 200.
+            retry_after (float, optional): Seconds from the Retry-After header, if any.
+        """
+        with self._lock:
+            self.inflight -= 1
+            now = time.monotonic()
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self._pausedUntil = max(self._pausedUntil, now + (self.default_backoff if retry_after is None else retry_after))
+                if now - self._lastDecrease > self.cooldown:
+                    self.limit = max(self.min_concurrency, self.limit * self.decrease)
+                    self._lastDecrease = now
+                    self.decreases += 1
+            elif 200 <= status < 500:
+                # additive increase, about one per limit successful requests
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            self._released.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """with limiter.slot() as report: ... report(resp.status_code), releases with status 0 if not reported
+        """
+        self.acquire()
+        outcome = {'status': 0, 'retry_after': None}
+        def report(status: int, retry_after: float = None):
+            outcome.update(status=status, retry_after=retry_after)
+        try:
+            yield report
+        finally:
+            self.release(**outcome)
+
+    @asynccontextmanager
+    async def slotAsync(self):
+        """async version of slot
+        """
+        await self.acquireAsync()
+        outcome = {'status': 0, 'retry_after': None}
+        def report(status: int, retry_after: float = None):
+            outcome.update(status=status, retry_after=retry_after)
+        try:
+            yield report
+        finally:
+            self.release(**outcome)
+
+    def snapshot(self) -> dict:
+        """Current limit and counts, e.g. for logging
+
+        Returns:
+            dict: limit, inflight, rate, requests, throttled, decreases, waitTime
+        """
+        with self._lock:
+            return {
+                'limit': max(1, int(self.limit)),
+                'inflight': self.inflight,
+                'rate': self.rate,
+                'requests': self.requests,
+                'throttled': self.throttled,
+                'decreases': self.decreases,
+                'waitTime': self.waitTime,
+            }
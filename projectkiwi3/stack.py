@@ -0,0 +1,127 @@
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Tuple, Union
+from projectkiwi3.models import Imagery
+
+
+class ImageStack(NamedTuple):
+    images: np.ndarray # (L, H, W, C), layers in the order requested
+    masks: np.ndarray # (L, H, W) bool, True where the layer has data
+    imageryIds: List[int]
+    errors: Dict[int, Exception] # imageryId -> error, for layers left empty with allow_missing
+
+
+def validMask(image: np.ndarray) -> np.ndarray:
+    """Pixels with data, from the alpha channel if there is one, otherwise pixels that aren't black.
+    get_part returns black outside the layer and outside irregular tasks.
+
+    Args:
+        image (np.ndarray): (H, W) or (H, W, C) image
+
+    Returns:
+        np.ndarray: (H, W) bool mask
+    """
+    if image.ndim == 2:
+        return image != 0
+    if image.shape[2] in (2, 4):
+        return image[..., -1] != 0
+    return image.any(axis=2)
+
+
+def colourChannels(image: np.ndarray) -> np.ndarray:
+    """(H, W, C) colour channels of an image, without alpha"""
+    if image.ndim == 2:
+        return image[..., None]
+    if image.shape[2] in (2, 4):
+        return image[..., :-1]
+    return image
+
+
+def resize(image: np.ndarray, height: int, width: int, nearest: bool = False) -> np.ndarray:
+    """Resize an (H, W) or (H, W, C) uint8 or bool image"""
+    if image.shape[:2] == (height, width):
+        return image
+    from PIL import Image
+    if image.dtype == bool:
+        resized = Image.fromarray(image.astype(np.uint8) * 255).resize((width, height), Image.NEAREST)
+        return np.asarray(resized) > 127
+    if image.ndim == 3 and image.shape[2] == 1:
+        return resize(image[..., 0], height, width, nearest)[..., None]
+    return np.asarray(Image.fromarray(image).resize((width, height), Image.NEAREST if nearest else Image.BILINEAR))
+
+
+def fetchStack(client, 
+               imagery: List[Union[int, Imagery]], 
+               coordinates: List[List[float]], 
+               max_size: int = 1024, 
+               padding_factor: float = None, 
+               shape: Tuple[int, int] = None, 
+               max_workers: int = 8,
+               allow_missing: bool = False) -> ImageStack:
+    """Fetch the same task from several imagery layers concurrently and stack them at a common size.
+
+    Args:
+        client (Client): client to fetch images with
+        imagery (List[Union[int, Imagery]]): Imagery layers or their ids, e.g. from getAllImagery
+        coordinates (List[List[float]]): coordinates in [[lng,lat], [lng,lat]] format
+        max_size (int, optional): maximum width for each image. Defaults to 1024.
+        padding_factor (float, optional): How much space to pad on each size. e.g. 0.2 will add 20% to each side
+        shape (Tuple[int, int], optional): (H, W) to resize every layer to. Defaults to the largest layer.
+        max_workers (int, optional): Number of concurrent requests. Defaults to 8.
+        allow_missing (bool, optional): Leave layers that fail empty (masked out) and record the error, 
+                instead of raising. Defaults to False.
+
+    Returns:
+        ImageStack: images (L, H, W, C) and masks (L, H, W), single band layers are repeated if others have colour
+    """
+    imageryIds = [layer.id if isinstance(layer, Imagery) else layer for layer in imagery]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(imageryIds))), thread_name_prefix="projectkiwi3") as executor:
+        futures = [executor.submit(client.getImageForTask, imageryId, coordinates, max_size=max_size, padding_factor=padding_factor)
+                   for imageryId in imageryIds]
+    results = [future.exception() or future.result() for future in futures]
+    return stackLayers(imageryIds, results, max_size=max_size, shape=shape, allow_missing=allow_missing)
+
+
+def stackLayers(imageryIds: List[int], 
+                results: List[Union[np.ndarray, Exception]], 
+                max_size: int = 1024, 
+                shape: Tuple[int, int] = None, 
+                allow_missing: bool = False) -> ImageStack:
+    """Stack images of the same task from several layers at a common size, see fetchStack.
+
+    Args:
+        imageryIds (List[int]): Imagery layer of each result
+        results (List[Union[np.ndarray, Exception]]): Image, or the error fetching it, for each layer
+        max_size (int, optional): Size of the stack if every layer failed. Defaults to 1024.
+        shape (Tuple[int, int], optional): (H, W) to resize every layer to. Defaults to the largest layer.
+        allow_missing (bool, optional): Leave layers that failed empty instead of raising. Defaults to False.
+
+    Returns:
+        ImageStack: the stack
+    """
+    layers: List[np.ndarray] = []
+    errors: Dict[int, Exception] = {}
+    for imageryId, result in zip(imageryIds, results):
+        if isinstance(result, BaseException):
+            if not allow_missing:
+                raise result
+            errors[imageryId] = result
+            result = None
+        layers.append(result)
+
+    fetched = [layer for layer in layers if layer is not None]
+    if shape is None:
+        shape = (max((layer.shape[0] for layer in fetched), default=max_size), 
+                 max((layer.shape[1] for layer in fetched), default=max_size))
+    height, width = shape
+    channels = max((colourChannels(layer).shape[2] for layer in fetched), default=3)
+
+    images = np.zeros((len(layers), height, width, channels), dtype=fetched[0].dtype if fetched else np.uint8)
+    masks = np.zeros((len(layers), height, width), dtype=bool)
+    for i, layer in enumerate(layers):
+        if layer is None:
+            continue
+        # the mask is taken at the original size, as interpolation would blur the black borders into the image
+        masks[i] = resize(validMask(layer), height, width)
+        images[i] = resize(colourChannels(layer), height, width)
+    return ImageStack(images, masks, imageryIds, errors)
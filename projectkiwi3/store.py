@@ -0,0 +1,178 @@
+import os
+import json
+import threading
+import numpy as np
+from typing import Dict, List, Tuple
+from projectkiwi3.chips import copyInto
+
+try:
+    import fcntl
+except ImportError: # windows, single writer is not enforced
+    fcntl = None
+
+
+INDEX_DTYPE = np.dtype([('taskId', '<i8'), ('height', '<i4'), ('width', '<i4')])
+
+
+class ChipStore():
+
+    def __init__(self, path: str, shape: Tuple[int, ...] = None, dtype: np.dtype = np.uint8, mode: str = "r", grow_by: int = 1024):
+        """Fixed slot store of task images in one memory-mapped file, for random access at training time.
+
+        Any number of processes may read while one appends. Readers share the same pages of the file, 
+        images are returned as views into the mapping without copies. The store can be passed to 
+        DataLoader workers, each reopens the files rather than pickling the data.
+
+        Files used are path.json (shape and dtype), path.data (the slots) and path.index (task id per slot).
+
+        Args:
+            path (str): path prefix for the store's files
+            shape (Tuple[int, ...], optional): (H,W,C) of each slot, e.g. (max_size, max_size, 3). Required to create a store.
+            dtype (np.dtype, optional): dtype of the images. Defaults to np.uint8.
+            mode (str, optional): "r" to read, "a" to append (creating the store if needed). Defaults to "r".
+            grow_by (int, optional): Slots added each time the data file is full. Defaults to 1024.
+        """
+        self.path = path
+        self.mode = mode
+        self.grow_by = grow_by
+        self._lock = threading.Lock()
+        self._lockFile = None
+
+        metaPath = f"{path}.json"
+        if not os.path.exists(metaPath):
+            if mode != "a" or shape is None:
+                raise FileNotFoundError(f"No chip store at {path}, open with mode='a' and a shape to create one")
+            with open(metaPath + ".tmp", "w") as f:
+                json.dump({'shape': list(shape), 'dtype': np.dtype(dtype).str}, f)
+            os.replace(metaPath + ".tmp", metaPath)
+        with open(metaPath) as f:
+            meta = json.load(f)
+        self.shape: Tuple[int, ...] = tuple(meta['shape'])
+        self.dtype = np.dtype(meta['dtype'])
+        self._slotBytes = int(np.prod(self.shape)) * self.dtype.itemsize
+
+        if mode == "a":
+            self._lockFile = open(f"{path}.lock", "w")
+            if fcntl is not None:
+                fcntl.flock(self._lockFile, fcntl.LOCK_EX | fcntl.LOCK_NB) # raises if another writer is open
+            for suffix in [".data", ".index"]:
+                open(path + suffix, "ab").close()
+
+        self._slots: Dict[int, int] = {}
+        self._sizes: List[Tuple[int, int]] = []
+        self._indexOffset = 0
+        self._data: np.memmap = None
+        self._refresh()
+
+    def __getstate__(self):
+        return {'path': self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state['path'])
+
+    def sync(self):
+        """Flush appended images and index records to disk, readers in other processes see them without syncing."""
+        if self.mode != "a":
+            return
+        with self._lock:
+            if self._data is not None:
+                self._data.flush()
+            with open(f"{self.path}.index", "ab") as f:
+                os.fsync(f.fileno())
+
+    def close(self):
+        self.sync()
+        self._data = None
+        if self._lockFile is not None:
+            self._lockFile.close()
+            self._lockFile = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _capacity(self) -> int:
+        return os.path.getsize(f"{self.path}.data") // self._slotBytes
+
+    def _map(self):
+        capacity = self._capacity()
+        if capacity == 0:
+            self._data = None
+            return
+        self._data = np.memmap(f"{self.path}.data", dtype=self.dtype, 
+                               mode="r+" if self.mode == "a" else "r", 
+                               shape=(capacity, *self.shape))
+
+    def _refresh(self):
+        """Read index records appended since the last refresh"""
+        with open(f"{self.path}.index", "rb") as f:
+            f.seek(self._indexOffset)
+            data = f.read()
+        # ignore a record still being written
+        records = np.frombuffer(data[:len(data) - len(data) % INDEX_DTYPE.itemsize], dtype=INDEX_DTYPE)
+        for record in records:
+            self._slots[int(record['taskId'])] = len(self._sizes)
+            self._sizes.append((int(record['height']), int(record['width'])))
+        self._indexOffset += records.nbytes
+        if self._data is None or len(self._sizes) > len(self._data):
+            self._map()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._slots)
+
+    def __contains__(self, taskId: int) -> bool:
+        with self._lock:
+            if taskId not in self._slots:
+                self._refresh()
+            return taskId in self._slots
+
+    def ids(self) -> List[int]:
+        """Task ids in the store"""
+        with self._lock:
+            self._refresh()
+            return list(self._slots)
+
+    def __getitem__(self, taskId: int) -> np.ndarray:
+        """Image for a task, as a read only view into the memory-mapped file"""
+        with self._lock:
+            if taskId not in self._slots:
+                self._refresh()
+            slot = self._slots[taskId]
+            height, width = self._sizes[slot]
+            image = self._data[slot, :height, :width]
+        if self.mode == "a":
+            image = image.view(np.ndarray)
+            image.flags.writeable = False
+        return image
+
+    def append(self, taskId: int, image: np.ndarray):
+        """Add the image for a task, each task can only be added once.
+
+        Args:
+            taskId (int): LabelingTask.id
+            image (np.ndarray): image no larger than the slot shape, e.g. from Client.getImageForTask
+        """
+        if self.mode != "a":
+            raise PermissionError("Chip store is open read only, open with mode='a' to append")
+        with self._lock:
+            if taskId in self._slots:
+                raise ValueError(f"Task {taskId} is already in the chip store")
+            slot = len(self._sizes)
+            if self._data is None or slot >= len(self._data):
+                with open(f"{self.path}.data", "r+b") as f:
+                    f.truncate((self._capacity() + self.grow_by) * self._slotBytes)
+                self._map()
+
+            # write the image before the index record, so readers never see a partial image. 
+            # the mapping shares the page cache with readers, so durability is left to sync()
+            copyInto(image, self._data[slot])
+            record = np.array([(taskId, image.shape[0], image.shape[1])], dtype=INDEX_DTYPE)
+            with open(f"{self.path}.index", "ab") as f:
+                f.write(record.tobytes())
+            self._slots[taskId] = slot
+            self._sizes.append(image.shape[:2])
+            self._indexOffset += record.nbytes
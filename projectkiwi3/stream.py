@@ -0,0 +1,73 @@
+import json
+import codecs
+from typing import Iterable, Iterator
+
+
+def iterJsonArray(chunks: Iterable[bytes]) -> Iterator[any]:
+    """Incrementally parse a json array, yielding one element at a time.
+
+    Only the element being parsed and the unparsed remainder of the current chunk are held in memory, 
+    so arbitrarily large responses can be processed in constant memory.
+
+    Args:
+        chunks (Iterable[bytes]): utf-8 encoded json document in pieces e.g. from resp.iter_content
+
+    Raises:
+        ValueError: if the document is not a json array
+
+    Yields:
+        any: each element of the array, as decoded by json.loads
+    """
+    decoder = json.JSONDecoder()
+    textDecoder = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer = ""
+    pos = 0
+    eof = False
+    started = False
+
+    def read() -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            buffer = buffer[pos:] + textDecoder.decode(b"", final=True)
+        else:
+            buffer = buffer[pos:] + textDecoder.decode(chunk)
+        pos = 0
+        return True
+
+    while True:
+        # skip whitespace and separators between elements
+        while pos < len(buffer) and buffer[pos] in " \t\r\n" + ("," if started else ""):
+            pos += 1
+        if pos >= len(buffer):
+            if not read():
+                raise ValueError("Unexpected end of json array")
+            continue
+
+        if not started:
+            if buffer[pos] != "[":
+                raise ValueError(f"Expected a json array, got {buffer[pos:pos + 20]!r}")
+            started = True
+            pos += 1
+            continue
+
+        if buffer[pos] == "]":
+            return
+
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # element continues in the next chunk
+            if not read():
+                raise
+            continue
+        if not eof and (end == len(buffer) or buffer[end] not in ",] \t\r\n"):
+            # a number at the end of the buffer may be cut short e.g. "1." of "1.5"
+            read()
+            continue
+        pos = end
+        yield value
@@ -0,0 +1,259 @@
+import numpy as np
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Union
+from projectkiwi3.models import Annotation, Label, LabelRegistry
+
+
+SHAPES = ("Point", "Polygon", "Linestring")
+
+
+class AnnotationRow(NamedTuple):
+    """A single annotation in an AnnotationTable, coordinates is a view into the table."""
+    id: int
+    labelId: int
+    confidence: float
+    shape: str
+    coordinates: np.ndarray # (n, 2) [[lng, lat], [lng, lat]]
+
+
+class AnnotationTable():
+
+    def __init__(self, 
+                 ids: np.ndarray, 
+                 labelIds: np.ndarray, 
+                 confidences: np.ndarray, 
+                 shapes: np.ndarray, 
+                 vertices: np.ndarray, 
+                 offsets: np.ndarray,
+                 subs: np.ndarray,
+                 createdAt: np.ndarray,
+                 modifiedAt: np.ndarray,
+                 labels: Dict[int, Label]):
+        """Columnar store of annotations, with one row per annotation.
+
+        Every vertex of every annotation is kept in a single (V, 2) float64 array, the coordinates of 
+        annotation i are vertices[offsets[i]:offsets[i+1]].
+
+        Args:
+            ids (np.ndarray): (N,) int64 annotation ids
+            labelIds (np.ndarray): (N,) int64 label ids
+            confidences (np.ndarray): (N,) float64 confidences
+            shapes (np.ndarray): (N,) int8 index into SHAPES
+            vertices (np.ndarray): (V, 2) float64 [[lng, lat], [lng, lat]]
+            offsets (np.ndarray): (N+1,) int64 start of each annotation in vertices
+            subs (np.ndarray): (N,) object, creator of each annotation
+            createdAt (np.ndarray): (N,) object
+            modifiedAt (np.ndarray): (N,) object
+            labels (Dict[int, Label]): labels by id, shared between rows
+        """
+        self.ids = ids
+        self.labelIds = labelIds
+        self.confidences = confidences
+        self.shapes = shapes
+        self.vertices = vertices
+        self.offsets = offsets
+        self.subs = subs
+        self.createdAt = createdAt
+        self.modifiedAt = modifiedAt
+        self.labels = labels
+
+    @classmethod
+    def from_json(cls, data: Iterable[dict]) -> "AnnotationTable":
+        """Build a table directly from annotation dicts as returned by the api, without creating
+        intermediate Annotation objects. data may be a generator e.g. from Client.iterGet.
+
+        Args:
+            data (Iterable[dict]): annotation dicts
+
+        Returns:
+            AnnotationTable: The table
+        """
+        ids = array("q")
+        labelIds = array("q")
+        confidences = array("d")
+        shapes = array("b")
+        vertices = array("d")
+        offsets = array("q", [0])
+        subs, createdAt, modifiedAt = [], [], []
+        registry = LabelRegistry()
+
+        for dict in data:
+            ids.append(dict['id'])
+            labelIds.append(dict['labelId'])
+            confidences.append(dict['confidence'])
+            shapes.append(SHAPES.index(dict['shape']))
+            for coord in dict['coordinates']:
+                vertices.append(coord['lng'])
+                vertices.append(coord['lat'])
+            offsets.append(len(vertices) // 2)
+            subs.append(dict['sub'])
+            createdAt.append(dict['createdAt'])
+            modifiedAt.append(dict['modifiedAt'])
+            registry.resolve(dict)
+
+        return cls(
+            ids = np.frombuffer(ids, dtype=np.int64),
+            labelIds = np.frombuffer(labelIds, dtype=np.int64),
+            confidences = np.frombuffer(confidences, dtype=np.float64),
+            shapes = np.frombuffer(shapes, dtype=np.int8),
+            vertices = np.frombuffer(vertices, dtype=np.float64).reshape(-1, 2),
+            offsets = np.frombuffer(offsets, dtype=np.int64),
+            subs = np.array(subs, dtype=object),
+            createdAt = np.array(createdAt, dtype=object),
+            modifiedAt = np.array(modifiedAt, dtype=object),
+            labels = {label.id: label for label in registry.labels.values()}
+        )
+
+    @classmethod
+    def from_annotations(cls, annotations: Iterable[Annotation]) -> "AnnotationTable":
+        """Build a table from Annotation objects.
+
+        Args:
+            annotations (Iterable[Annotation]): annotations e.g. from Client.getAnnotations
+
+        Returns:
+            AnnotationTable: The table
+        """
+        return cls.from_json({
+            'id': anno.id,
+            'labelId': anno.labelId,
+            'confidence': anno.confidence,
+            'shape': anno.shape,
+            'coordinates': [{'lng': lng, 'lat': lat} for lng, lat in anno.coordinates],
+            'sub': anno.sub,
+            'createdAt': anno.createdAt,
+            'modifiedAt': anno.modifiedAt,
+            'label': anno.label.model_dump()
+        } for anno in annotations)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def coordinates(self, i: int) -> np.ndarray:
+        """Coordinates of a single annotation, as a view into the table.
+
+        Args:
+            i (int): row index
+
+        Returns:
+            np.ndarray: (n, 2) [[lng, lat], [lng, lat]]
+        """
+        return self.vertices[self.offsets[i]:self.offsets[i + 1]]
+
+    def __getitem__(self, index: Union[int, slice, np.ndarray]) -> Union[AnnotationRow, "AnnotationTable"]:
+        """A single row, or a new table for a slice, boolean mask or array of row indices."""
+        if isinstance(index, (int, np.integer)):
+            if index < 0:
+                index += len(self)
+            return AnnotationRow(
+                id = self.ids[index].item(),
+                labelId = self.labelIds[index].item(),
+                confidence = self.confidences[index].item(),
+                shape = SHAPES[self.shapes[index]],
+                coordinates = self.coordinates(index)
+            )
+        return self.take(np.arange(len(self))[index])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def take(self, indices: np.ndarray) -> "AnnotationTable":
+        """Select rows, the vertices of the selected rows are gathered in one vectorized pass.
+
+        Args:
+            indices (np.ndarray): row indices or boolean mask
+
+        Returns:
+            AnnotationTable: New table with just the selected rows
+        """
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+
+        starts = self.offsets[indices]
+        counts = self.offsets[indices + 1] - starts
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        vertexIndex = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1])
+
+        return AnnotationTable(
+            ids = self.ids[indices],
+            labelIds = self.labelIds[indices],
+            confidences = self.confidences[indices],
+            shapes = self.shapes[indices],
+            vertices = self.vertices[vertexIndex],
+            offsets = offsets,
+            subs = self.subs[indices],
+            createdAt = self.createdAt[indices],
+            modifiedAt = self.modifiedAt[indices],
+            labels = self.labels
+        )
+
+    def mask(self, 
+             labelIds: List[int] = None, 
+             minConfidence: float = None, 
+             maxConfidence: float = None, 
+             shapes: List[str] = None) -> np.ndarray:
+        """Boolean mask of rows matching every given condition.
+
+        Args:
+            labelIds (List[int], optional): keep rows with one of these labels
+            minConfidence (float, optional): keep rows with confidence >= minConfidence
+            maxConfidence (float, optional): keep rows with confidence <= maxConfidence
+            shapes (List[str], optional): keep rows with one of these shapes e.g. ["Polygon"]
+
+        Returns:
+            np.ndarray: (N,) bool
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if labelIds is not None:
+            mask &= np.isin(self.labelIds, labelIds)
+        if minConfidence is not None:
+            mask &= self.confidences >= minConfidence
+        if maxConfidence is not None:
+            mask &= self.confidences <= maxConfidence
+        if shapes is not None:
+            mask &= np.isin(self.shapes, [SHAPES.index(shape) for shape in shapes])
+        return mask
+
+    def filter(self, 
+               labelIds: List[int] = None, 
+               minConfidence: float = None, 
+               maxConfidence: float = None, 
+               shapes: List[str] = None) -> "AnnotationTable":
+        """New table with only the rows matching every given condition, see mask.
+
+        Returns:
+            AnnotationTable: The filtered table
+        """
+        return self.take(self.mask(labelIds, minConfidence, maxConfidence, shapes))
+
+    def toAnnotation(self, i: int) -> Annotation:
+        """Convert a single row back to an Annotation.
+
+        Args:
+            i (int): row index
+
+        Returns:
+            Annotation: The annotation
+        """
+        return Annotation(
+            id = self.ids[i].item(),
+            sub = self.subs[i],
+            shape = SHAPES[self.shapes[i]],
+            createdAt = self.createdAt[i],
+            confidence = self.confidences[i].item(),
+            labelId = self.labelIds[i].item(),
+            label = self.labels[self.labelIds[i].item()],
+            modifiedAt = self.modifiedAt[i],
+            coordinates = self.coordinates(i).tolist()
+        )
+
+    def toAnnotations(self) -> List[Annotation]:
+        """Convert every row back to an Annotation.
+
+        Returns:
+            List[Annotation]: The annotations
+        """
+        return [self.toAnnotation(i) for i in range(len(self))]
@@ -0,0 +1,166 @@
+import math
+import numpy as np
+from typing import Iterator, List, NamedTuple, Optional, Tuple, Union
+from projectkiwi3.geo import TaskGeoTransform, padPolygon, lngLatToMercator
+
+
+class Tile(NamedTuple):
+    row: int
+    col: int
+    x: int # left edge in the full image, pixels
+    y: int # top edge in the full image, pixels
+    width: int
+    height: int
+    coordinates: List[List[float]] # closed rectangle in [[lng, lat], [lng, lat]] format
+    transform: TaskGeoTransform # pixels within this tile <-> lng, lat
+
+
+class TileGrid():
+
+    def __init__(self, 
+                 taskCoordinates: List[List[float]], 
+                 resolution: float, 
+                 tile_size: int = 1024, 
+                 padding_factor: float = None):
+        """Split a task into a grid of tiles covering it at a given ground resolution, e.g. to fetch 
+        an area larger than get_part's max_size at full resolution.
+
+        The full image is north up in Web Mercator, transform maps its pixels to lng, lat and can be used 
+        with the utils helpers (transform=) to convert detections on the full image.
+
+        Args:
+            taskCoordinates (List[List[float]]): Coordinates for the task in [[lng, lat], [lng, lat]] format
+            resolution (float): Ground size of a pixel in metres, at the centre of the task
+            tile_size (int, optional): Maximum width and height of each tile in pixels. Defaults to 1024.
+            padding_factor (float, optional): How much space to pad on each size. e.g. 0.2 will add 20% to each side
+        """
+        self.taskCoordinates = taskCoordinates
+        self.padding_factor = padding_factor
+        self.resolution = resolution
+        self.tile_size = tile_size
+
+        base = TaskGeoTransform(taskCoordinates, padding_factor=padding_factor, mercator=True)
+        west, south, east, north = base.bounds
+        (left, bottom), (right, top) = lngLatToMercator(np.array([[west, south], [east, north]]))
+        # web mercator stretches distances by 1 / cos(lat)
+        mercatorResolution = resolution / math.cos(math.radians((south + north) / 2))
+        self.width = max(1, math.ceil((right - left) / mercatorResolution))
+        self.height = max(1, math.ceil((top - bottom) / mercatorResolution))
+        self.rows = math.ceil(self.height / tile_size)
+        self.cols = math.ceil(self.width / tile_size)
+        self.transform = base.withSize(self.width, self.height)
+
+    def __len__(self) -> int:
+        return self.rows * self.cols
+
+    def __iter__(self) -> Iterator[Tile]:
+        for row in range(self.rows):
+            for col in range(self.cols):
+                yield self.tile(row, col)
+
+    def tile(self, row: int, col: int) -> Tile:
+        """Tile at a grid position, rows from the top (north) and columns from the left (west)
+
+        Returns:
+            Tile: the tile
+        """
+        x, y = col * self.tile_size, row * self.tile_size
+        width, height = min(self.tile_size, self.width - x), min(self.tile_size, self.height - y)
+        corners = np.array([[x, y], [x + width, y], [x + width, y + height], [x, y + height], [x, y]], dtype=np.float64)
+        coordinates = self.transform.pixelToLngLat(corners).tolist()
+        return Tile(row, col, x, y, width, height, coordinates, 
+                    TaskGeoTransform(coordinates, width, height, mercator=True))
+
+    def mask(self, tile: Tile) -> Optional[np.ndarray]:
+        """Pixels of a tile inside the (padded) task polygon, as get_part blacks out the rest of irregular tasks
+
+        Args:
+            tile (Tile): the tile
+
+        Returns:
+            Optional[np.ndarray]: (height, width) bool mask, or None if the tile is entirely inside
+        """
+        from PIL import Image, ImageDraw
+        polygon = self.taskCoordinates
+        if self.padding_factor:
+            polygon = padPolygon(polygon, self.padding_factor)
+        pixels = self.transform.lngLatToPixel(np.asarray(polygon, dtype=np.float64)) - np.array([tile.x, tile.y])
+        image = Image.new("1", (tile.width, tile.height), 0)
+        ImageDraw.Draw(image).polygon([tuple(p) for p in pixels.tolist()], fill=1)
+        mask = np.asarray(image, dtype=bool)
+        return None if mask.all() else mask
+
+
+def fitTile(image: np.ndarray, tile: Tile, mask: Optional[np.ndarray]) -> np.ndarray:
+    """Resample an image to the tile's size if get_part returned a different one, and apply the mask
+    """
+    if image.shape[:2] != (tile.height, tile.width):
+        from PIL import Image
+        image = np.asarray(Image.fromarray(image).resize((tile.width, tile.height), Image.BILINEAR))
+    if mask is not None:
+        image = image * mask.reshape(mask.shape + (1,) * (image.ndim - 2)).astype(image.dtype)
+    return image
+
+
+def iterTiles(client, 
+              imageryId: int, 
+              grid: TileGrid, 
+              max_workers: int = 8, 
+              ordered: bool = False, 
+              return_exceptions: bool = False) -> Iterator[Tuple[Tile, Union[np.ndarray, Exception]]]:
+    """Fetch the tiles of a grid concurrently, tiles outside the task polygon are skipped.
+
+    Args:
+        client (Client): client to fetch images with
+        imageryId (int): Id of Imagery layer to extract images from
+        grid (TileGrid): the tiles
+        max_workers (int, optional): Number of concurrent requests. Defaults to 8.
+        ordered (bool, optional): Yield tiles in row major order, otherwise as they complete. Defaults to False.
+        return_exceptions (bool, optional): Yield (tile, exception) for failed tiles instead of raising. Defaults to False.
+
+    Yields:
+        Tuple[Tile, Union[np.ndarray, Exception]]: (tile, image) pairs, each image is (tile.height, tile.width, C)
+    """
+    masks = {}
+    def tiles() -> Iterator[Tile]:
+        for tile in grid:
+            mask = grid.mask(tile)
+            if mask is not None and not mask.any():
+                continue
+            masks[tile.row, tile.col] = mask
+            yield tile
+
+    images = client.getImagesForTasks(imageryId, tiles(), max_size=grid.tile_size, max_workers=max_workers, 
+                                      ordered=ordered, return_exceptions=return_exceptions)
+    for tile, image in images:
+        mask = masks.pop((tile.row, tile.col))
+        yield tile, image if isinstance(image, Exception) else fitTile(image, tile, mask)
+
+
+def fetchMosaic(client, 
+                imageryId: int, 
+                grid: TileGrid, 
+                max_workers: int = 8, 
+                max_pixels: int = 2**28) -> np.ndarray:
+    """Fetch every tile of a grid and stitch them into one image.
+
+    Args:
+        client (Client): client to fetch images with
+        imageryId (int): Id of Imagery layer to extract images from
+        grid (TileGrid): the tiles
+        max_workers (int, optional): Number of concurrent requests. Defaults to 8.
+        max_pixels (int, optional): Refuse to allocate images larger than this, use iterTiles instead. Defaults to 2**28.
+
+    Returns:
+        np.ndarray: (grid.height, grid.width, C) image, black outside the task
+    """
+    if grid.width * grid.height > max_pixels:
+        raise ValueError(f"{grid.width}x{grid.height} image is larger than max_pixels, stream the tiles with iterTiles instead")
+    mosaic = None
+    for tile, image in iterTiles(client, imageryId, grid, max_workers=max_workers):
+        if mosaic is None:
+            mosaic = np.zeros((grid.height, grid.width) + image.shape[2:], dtype=image.dtype)
+        mosaic[tile.y:tile.y + tile.height, tile.x:tile.x + tile.width] = image
+    if mosaic is None:
+        mosaic = np.zeros((grid.height, grid.width, 3), dtype=np.uint8)
+    return mosaic
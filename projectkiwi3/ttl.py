@@ -0,0 +1,104 @@
+import time
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Tuple
+from projectkiwi3.metrics import Metrics
+
+
+_missing = object()
+
+
+class TTLCache():
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 4096, metrics: Metrics = None, name: str = "metadata"):
+        """In-memory cache of recent responses, shared safely between threads.
+
+        Concurrent lookups of the same missing key are coalesced, one caller fetches 
+        and the others wait for its result. Failed fetches are not cached.
+
+        Args:
+            ttl (float, optional): Seconds an entry stays fresh, 0 disables caching 
+                    (concurrent lookups are still coalesced). Defaults to 60.
+            max_entries (int, optional): Oldest entries are dropped beyond this. Defaults to 4096.
+            metrics (Metrics, optional): Record hits and misses here, coalesced lookups count as hits.
+            name (str, optional): Cache name for metrics. Defaults to "metadata".
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.metrics = metrics
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[float, any]] = {} # key -> (expiry, value), in insertion order
+        self._inflight: Dict[Hashable, Future] = {}
+
+    def get(self, key: Hashable, fetch: Callable[[], any], ttl: float = None) -> any:
+        """Cached value for key, calling fetch if it is missing or stale.
+
+        Args:
+            key (Hashable): cache key e.g. the request url
+            fetch (Callable[[], any]): produces the value
+            ttl (float, optional): Seconds to keep this value fresh. Defaults to the cache's ttl.
+
+        Returns:
+            any: the value, shared with other callers so it should not be modified
+        """
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            entry = self._entries.get(key)
+            fresh = entry is not None and entry[0] > time.monotonic()
+            future = None if fresh else self._inflight.get(key)
+            owner = not fresh and future is None
+            if fresh:
+                self.hits += 1
+            elif owner:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if self.metrics is not None:
+            self.metrics.observeCache(self.name, not owner)
+        if fresh:
+            return entry[1]
+        if not owner:
+            return future.result()
+
+        try:
+            value = fetch()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            if ttl > 0:
+                self._entries.pop(key, None)
+                self._entries[key] = (time.monotonic() + ttl, value)
+                while len(self._entries) > self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+        future.set_result(value)
+        return value
+
+    def invalidate(self, key: Hashable, value: any = _missing):
+        """Drop an entry so the next lookup fetches it again. Fetches already in flight are not affected.
+
+        Args:
+            key (Hashable): cache key
+            value (any, optional): Only drop the entry if it still holds this value, 
+                    so a value refreshed by another thread is kept.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (value is _missing or entry[1] == value):
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,6 +1,40 @@
 import numpy as np
-from typing import List
-import shapely
+from typing import List, Tuple
+from projectkiwi3.geo import TaskGeoTransform
+
+
+def taskBounds(taskCoordinates: List[List[float]], padding_factor: float = None) -> Tuple[float, float, float, float]:
+    """Bounding box of a task, grown by padding_factor on each side the same way getImageForTask pads the task.
+
+    Args:
+        taskCoordinates (List[List[float]]): Coordinates for the task in [[lng, lat], [lng, lat]] format
+        padding_factor(float, optional): If a padding factor was used to get the task image, it must be supplied here
+
+    Returns:
+        Tuple[float, float, float, float]: west, south, east, north
+    """
+    return TaskGeoTransform(taskCoordinates, padding_factor=padding_factor).bounds
+
+
+def normalizedPointsToLngLatArray(points: np.ndarray, taskCoordinates: List[List[float]] = None, padding_factor: float = None, 
+                                  transform: TaskGeoTransform = None) -> np.ndarray:
+    """Vectorized normalizedPointsToLngLat, for any number of points in one pass.
+    To convert points for the same task repeatedly, build a TaskGeoTransform once and use pixelToLngLat.
+
+    Args:
+        points (np.ndarray): (..., 2) array of x,y normalised coordinates in range of [0,1]
+        taskCoordinates (List[List[float]]): Coordinates for the task in [[lng, lat], [lng, lat]] format
+        padding_factor(float, optional): If a padding factor was used to get the task image, it must be supplied here
+        transform (TaskGeoTransform, optional): Transform for the image instead of taskCoordinates and padding_factor, 
+                e.g. from Client.getLargeImageForTask
+
+    Returns:
+        np.ndarray: (..., 2) array of [lng, lat]
+    """
+    if transform is None:
+        transform = TaskGeoTransform(taskCoordinates, padding_factor=padding_factor)
+    return transform.withSize(1, 1).pixelToLngLat(points)
+
 
 def normalizedPointsToLngLat(points: List[List[float]], taskCoordinates: List[List[float]], padding_factor: float = None) -> List[List[float]]:
     """Converts a list of points within a task to lat, lng coordinates. May be inaccurate for large tasks.
@@ -13,26 +47,12 @@ def normalizedPointsToLngLat(points: List[List[float]], taskCoordinates: List[Li
     Returns:
         List[List[float]]: Coordinates for the polygon in [[lng, lat], [lng, lat]] format
     """
-    
-    if padding_factor:
-        polygon = shapely.Polygon(taskCoordinates)
-        scaled_polygon = shapely.affinity.scale(polygon, xfact=1+(2*padding_factor), yfact=1+(2*padding_factor))
-        taskCoordinates = list(scaled_polygon.exterior.coords)
-
-    x1_task = np.min(np.array(taskCoordinates)[:,0]).item() # most west
-    x2_task = np.max(np.array(taskCoordinates)[:,0]).item() # most east
-    y1_task = np.min(np.array(taskCoordinates)[:,1]).item() # most south
-    y2_task = np.max(np.array(taskCoordinates)[:,1]).item() # most north
-
-    outputPoints = []
-    for p in points:
-        p_lng_lat = [x1_task + p[0]*(x2_task-x1_task), y2_task - p[1]*(y2_task-y1_task)]
-        outputPoints.append(p_lng_lat)
-    return outputPoints
+    return normalizedPointsToLngLatArray(np.asarray(points, dtype=np.float64).reshape(-1, 2), taskCoordinates, padding_factor).tolist()
 
 
 # x1, y1, x2, y2
-def boxToLngLatPolygon(box: List[float], w, h, taskCoordinates: List[List[float]], padding_factor: float = None) -> List[List[float]]:
+def boxToLngLatPolygon(box: List[float], w, h, taskCoordinates: List[List[float]] = None, padding_factor: float = None,
+                       transform: TaskGeoTransform = None) -> List[List[float]]:
     """Converts a bounding box to a polygon with lng, lat coordinates
 
     Args:
@@ -41,16 +61,37 @@ def boxToLngLatPolygon(box: List[float], w, h, taskCoordinates: List[List[float]
         h (_type_): Image height in pixels
         taskCoordinates (List[List[float]]): Coordinates for the task in [[lng, lat], [lng, lat]] format
         padding_factor(float, optional): If a padding factor was used to get the task image, it must be supplied here
+        transform (TaskGeoTransform, optional): Transform for the image instead of taskCoordinates and padding_factor
 
     Returns:
         List[List[float]]: Coordinates for the polygon in [[lng, lat], [lng, lat]] format
     """    
-    x1, y1, x2, y2 = box
-    p1 = [x1/w, y1/h]
-    p2 = [x2/w, y1/h]
-    p3 = [x2/w, y2/h]
-    p4 = [x1/w, y2/h]
-    points = [p1, p2, p3, p4, p1]
-
-    return normalizedPointsToLngLat(points, taskCoordinates, padding_factor)
-    
\ No newline at end of file
+    return boxesToLngLatPolygons(np.asarray([box]), w, h, taskCoordinates, padding_factor, transform)[0].tolist()
+
+
+def boxesToLngLatPolygons(boxes: np.ndarray, w, h, taskCoordinates: List[List[float]] = None, padding_factor: float = None,
+                          transform: TaskGeoTransform = None) -> np.ndarray:
+    """Converts many bounding boxes to polygons with lng, lat coordinates in one vectorized pass
+
+    Args:
+        boxes (np.ndarray): (N, 4) Bounding boxes with x1, y1, x2, y2 format, in pixels
+        w (_type_): Image width in pixels
+        h (_type_): Image height in pixels
+        taskCoordinates (List[List[float]]): Coordinates for the task in [[lng, lat], [lng, lat]] format
+        padding_factor(float, optional): If a padding factor was used to get the task image, it must be supplied here
+        transform (TaskGeoTransform, optional): Transform for the image instead of taskCoordinates and padding_factor, 
+                e.g. from Client.getLargeImageForTask
+
+    Returns:
+        np.ndarray: (N, 5, 2) closed polygons, the corners of each box clockwise from top left, in [lng, lat]
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4) / np.array([w, h, w, h])
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    points = np.stack([
+        np.stack([x1, y1], axis=-1),
+        np.stack([x2, y1], axis=-1),
+        np.stack([x2, y2], axis=-1),
+        np.stack([x1, y2], axis=-1),
+        np.stack([x1, y1], axis=-1),
+    ], axis=1)
+    return normalizedPointsToLngLatArray(points, taskCoordinates, padding_factor, transform)
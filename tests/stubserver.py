@@ -0,0 +1,83 @@
+"""Minimal local stand-in for the projectkiwi api, used by the offline tests.
+"""
+import gzip
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, Tuple
+
+
+class StubServer():
+    """Serve canned responses from a dict of routes.
+
+    Each route maps "METHOD /path" to a function taking the request body (bytes) and
+    returning (status, body) or (status, body, headers), where body is bytes or anything json serializable.
+    gzip request bodies are decompressed, and with gzip_responses=True responses are compressed if the client accepts it.
+    """
+
+    def __init__(self, routes: Dict[str, Callable[[bytes], Tuple[int, any]]], gzip_responses: bool = False):
+        self.routes = routes
+        self.gzip_responses = gzip_responses
+        self.calls: Dict[str, int] = {}
+        self.headers: Dict[str, dict] = {} # "METHOD /path" -> headers of the last request
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def handle_one(self, method: str):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length else b""
+                key = f"{method} {self.path}"
+                stub.calls[key] = stub.calls.get(key, 0) + 1
+                stub.headers[key] = dict(self.headers)
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+                if key not in stub.routes:
+                    status, payload, headers = 404, {"error": "not found"}, []
+                else:
+                    status, payload, *headers = stub.routes[key](body)
+                if not isinstance(payload, bytes):
+                    payload = json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in (headers[0] if headers else {}).items():
+                    self.send_header(name, value)
+                if stub.gzip_responses and "gzip" in self.headers.get("Accept-Encoding", ""):
+                    payload = gzip.compress(payload)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self.handle_one("GET")
+
+            def do_POST(self):
+                self.handle_one("POST")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def encodeChip(array) -> bytes:
+    """Encode an array the way get_part returns it, a base64 encoded png
+    """
+    import io
+    import base64
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.fromarray(array).save(buffer, format="PNG")
+    return base64.encodebytes(buffer.getvalue())
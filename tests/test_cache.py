@@ -0,0 +1,69 @@
+import os
+import numpy as np
+import projectkiwi3
+from projectkiwi3 import ChipCache
+
+from tests.stubserver import StubServer, encodeChip
+
+
+COORDS = [[1.0, 2.0], [1.0, 3.0], [2.0, 3.0], [1.0, 2.0]]
+
+
+def test_key_normalizes_polygon():
+    """Float noise and ring closure don't change the key, but any request parameter does
+    """
+    key = ChipCache.key(5, "2024", COORDS, 1024)
+    assert key == ChipCache.key(5, "2024", [[1.0 + 1e-12, 2.0], [1.0, 3.0], [2.0, 3.0]], 1024)
+    assert key != ChipCache.key(5, "2025", COORDS, 1024)
+    assert key != ChipCache.key(5, "2024", COORDS, 512)
+    assert key != ChipCache.key(5, "2024", COORDS, 1024, padding_factor=0.2)
+    assert key != ChipCache.key(6, "2024", COORDS, 1024)
+
+
+def test_lru_eviction(tmp_path):
+    chip = np.zeros((32, 32, 3), dtype=np.uint8)
+    cache = ChipCache(str(tmp_path), max_bytes=4 * chip.nbytes)
+
+    cache.put("a" * 64, chip)
+    cache.put("b" * 64, chip)
+    cache.put("c" * 64, chip)
+    assert cache.get("a" * 64) is not None # a is now most recently used
+
+    # make the ordering deterministic regardless of file system timestamp resolution
+    os.utime(cache._path("b" * 64), (0, 0))
+    os.utime(cache._path("c" * 64), (1, 1))
+
+    cache.put("d" * 64, chip)
+    cache.put("e" * 64, chip)
+    assert cache.get("b" * 64) is None
+    assert cache.get("a" * 64) is not None
+    assert cache.size <= cache.max_bytes
+    assert cache.hits == 2 and cache.misses == 1
+
+
+def test_overwrite_keeps_size(tmp_path):
+    """Putting a chip again replaces the old file, so it is only counted once
+    """
+    cache = ChipCache(str(tmp_path))
+    cache.put("a" * 64, np.zeros((32, 32, 3), dtype=np.uint8))
+    cache.put("a" * 64, np.zeros((16, 16, 3), dtype=np.uint8))
+    assert cache.size == os.path.getsize(cache._path("a" * 64))
+    assert ChipCache(str(tmp_path)).size == cache.size
+
+
+def test_client_uses_cache(tmp_path):
+    imagery = {"id": 11, "sub": "me", "name": "layer", "createdAt": "2024", "ready": True, 
+               "error": False, "storageSizeKB": 1, "modifiedAt": "2024"}
+    routes = {
+        "GET /api/imagery/11": lambda body: (200, imagery),
+        "GET /api/imagery/11/download_url": lambda body: (200, "https://example.com/cog.tif"),
+        "POST /get_part": lambda body: (200, encodeChip(np.full((4, 4, 3), 7, dtype=np.uint8))),
+    }
+    with StubServer(routes) as stub:
+        cache = ChipCache(str(tmp_path))
+        with projectkiwi3.Client("key", stub.url, part_url=f"{stub.url}/get_part", chip_cache=cache) as client:
+            first = client.getImageForTask(11, COORDS)
+            second = client.getImageForTask(11, COORDS)
+        assert stub.calls["POST /get_part"] == 1
+    assert (first == second).all()
+    assert cache.hits == 1 and cache.misses == 1
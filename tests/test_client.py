@@ -0,0 +1,310 @@
+import pytest
+import requests
+import projectkiwi3
+
+from tests.stubserver import StubServer
+
+
+def flaky(failures: int, payload: any):
+    """Route that fails with a 503 the first few times
+    """
+    state = {"n": 0}
+    def route(body: bytes):
+        state["n"] += 1
+        if state["n"] <= failures:
+            return 503, {"error": "unavailable"}
+        return 200, payload
+    return route
+
+
+def test_get_retries_server_errors():
+    """GETs are retried with backoff on 5xx
+    """
+    with StubServer({"GET /api/project": flaky(2, [])}) as stub:
+        with projectkiwi3.Client("key", stub.url, backoff_factor=0) as client:
+            assert client.getProjects() == []
+        assert stub.calls["GET /api/project"] == 3
+
+
+def test_get_gives_up_after_max_retries():
+    with StubServer({"GET /api/project": flaky(10, [])}) as stub:
+        with projectkiwi3.Client("key", stub.url, max_retries=1, backoff_factor=0) as client:
+            with pytest.raises(requests.HTTPError):
+                client.getProjects()
+        assert stub.calls["GET /api/project"] == 2
+
+
+def test_post_not_retried_on_server_error():
+    """Writes may have been applied, so a 5xx is not retried
+    """
+    with StubServer({"POST /api/project": flaky(1, {})}) as stub:
+        with projectkiwi3.Client("key", stub.url, backoff_factor=0) as client:
+            with pytest.raises(requests.HTTPError):
+                client.createProject("test")
+        assert stub.calls["POST /api/project"] == 1
+
+
+def test_async_client_returns_models():
+    """AsyncClient runs requests concurrently and returns the same models as Client
+    """
+    import asyncio
+
+    project = {"id": 7, "name": "p", "createdAt": "2024", "modifiedAt": "2024", "owner": "me"}
+
+    async def main(url: str):
+        async with projectkiwi3.AsyncClient("key", url, max_concurrency=8) as client:
+            return await asyncio.gather(*[client.getProject(7) for _ in range(20)])
+
+    with StubServer({"GET /api/project/7": lambda body: (200, project)}) as stub:
+        projects = asyncio.run(main(stub.url))
+    assert len(projects) == 20
+    assert all(isinstance(p, projectkiwi3.models.Project) and p.id == 7 for p in projects)
+
+
+def chipRoutes(failOn: float = None):
+    """Routes for the download url and get_part, the chip is filled with the first longitude of the polygon
+    """
+    import json
+    import numpy as np
+    from tests.stubserver import encodeChip
+
+    def getPart(body: bytes):
+        request = json.loads(body)
+        lng = request["polygon"]["geometry"]["coordinates"][0][0][0]
+        if lng == failOn:
+            return 500, {"error": "bad polygon"}
+        return 200, encodeChip(np.full((4, 4, 3), lng, dtype=np.uint8))
+
+    return {
+        "GET /api/imagery/5/download_url": lambda body: (200, "https://example.com/cog.tif"),
+        "POST /get_part": getPart,
+    }
+
+
+def makeTasks(n: int):
+    return [projectkiwi3.models.LabelingTask(id=i, complete=False, completedBy=None, 
+                                              coordinates=[[i, 0], [i, 1], [i + 1, 1], [i, 0]]) for i in range(n)]
+
+
+def test_get_images_for_tasks():
+    """Batch fetch yields every task with its chip, and reports failures without aborting
+    """
+    tasks = makeTasks(30)
+    with StubServer(chipRoutes(failOn=3)) as stub:
+        with projectkiwi3.Client("key", stub.url, part_url=f"{stub.url}/get_part", max_retries=0) as client:
+            results = list(client.getImagesForTasks(5, tasks, max_workers=4))
+            unordered = list(client.getImagesForTasks(5, tasks, max_workers=4, ordered=False))
+        assert stub.calls["GET /api/imagery/5/download_url"] == 1
+
+    assert [task.id for task, _ in results] == list(range(30))
+    assert sorted(task.id for task, _ in unordered) == list(range(30))
+    for task, image in results:
+        if task.id == 3:
+            assert isinstance(image, requests.HTTPError)
+        else:
+            assert image.shape == (4, 4, 3) and (image == task.id).all()
+
+
+def test_async_get_images_for_tasks_is_bounded():
+    """The async batch fetch yields every task, and only schedules a window of requests ahead of the consumer
+    """
+    import asyncio
+
+    tasks = makeTasks(40)
+
+    async def main(url: str):
+        async with projectkiwi3.AsyncClient("key", url, max_concurrency=2, part_url=f"{url}/get_part", max_retries=0) as client:
+            results = [item async for item in client.getImagesForTasks(5, tasks)]
+            unordered = [item async for item in client.getImagesForTasks(5, tasks, ordered=False)]
+            async for _ in client.getImagesForTasks(5, tasks):
+                break
+            return results, unordered
+
+    with StubServer(chipRoutes(failOn=3)) as stub:
+        results, unordered = asyncio.run(main(stub.url))
+        assert stub.calls["POST /get_part"] <= 2 * 40 + 2 * 2
+
+    assert [task.id for task, _ in results] == list(range(40))
+    assert sorted(task.id for task, _ in unordered) == list(range(40))
+    assert isinstance(results[3][1], requests.HTTPError)
+
+
+def annotationDict(id: int, labelId: int = 1) -> dict:
+    return {
+        "id": id, "sub": "me", "shape": "Polygon", "createdAt": "2024", "confidence": 0.5, 
+        "labelId": labelId, "modifiedAt": "2024",
+        "label": {"id": labelId, "name": "tree", "color": "rgb(0, 255, 0)", "active": True, "modifiedAt": "2024"},
+        "coordinates": [{"lng": id, "lat": 0}, {"lng": id, "lat": 1}, {"lng": id + 1, "lat": 1}, {"lng": id, "lat": 0}]
+    }
+
+
+def test_iter_annotations():
+    """Streaming annotations matches getAnnotations, one at a time or in batches
+    """
+    annotations = [annotationDict(i) for i in range(1000)]
+    with StubServer({"GET /api/project/3/annotations": lambda body: (200, annotations)}) as stub:
+        with projectkiwi3.Client("key", stub.url) as client:
+            expected = client.getAnnotations(3)
+            single = list(client.iterGet(f"{stub.url}/api/project/3/annotations", chunk_size=100))
+            streamed = list(client.iterAnnotations(3))
+            batches = list(client.iterAnnotations(3, batch_size=300))
+
+    assert single == annotations
+    assert streamed == expected
+    assert [len(batch) for batch in batches] == [300, 300, 300, 100]
+    assert [a for batch in batches for a in batch] == expected
+
+
+def test_trusted_records_match_models():
+    annotations = [annotationDict(i) for i in range(50)]
+    with StubServer({"GET /api/project/3/annotations": lambda body: (200, annotations)}) as stub:
+        with projectkiwi3.Client("key", stub.url) as client:
+            expected = client.getAnnotations(3)
+            records = client.getAnnotations(3, trusted=True)
+
+    assert all(isinstance(record, projectkiwi3.models.AnnotationRecord) for record in records)
+    assert [record.toModel() for record in records] == expected
+    assert records[0].label.name == expected[0].label.name
+
+
+def test_labels_are_shared():
+    """Annotations with the same label share one instance, and known labels skip the embedded copy
+    """
+    annotations = [annotationDict(i, labelId=1 + i % 2) for i in range(10)]
+    with StubServer({"GET /api/project/3/annotations": lambda body: (200, annotations)}) as stub:
+        with projectkiwi3.Client("key", stub.url) as client:
+            decoded = client.getAnnotations(3)
+            known = projectkiwi3.models.Label(id=1, name="known", color="rgb(0, 0, 0)", active=True, modifiedAt="2024")
+            withKnown = client.getAnnotations(3, labels=[known])
+
+    assert decoded[0].label is decoded[2].label
+    assert decoded[0].label is not decoded[1].label
+    assert all(annotation.label is known for annotation in withKnown if annotation.labelId == 1)
+    assert withKnown[1].label.name == "tree"
+
+
+def test_known_labels_match_decoded_type():
+    """Known labels are converted to the type being decoded, whether they came from a trusted call or not
+    """
+    annotations = [annotationDict(i, labelId=1) for i in range(3)]
+    label = projectkiwi3.models.Label(id=1, name="known", color="rgb(0, 0, 0)", active=True, modifiedAt="2024")
+    with StubServer({"GET /api/project/3/annotations": lambda body: (200, annotations)}) as stub:
+        with projectkiwi3.Client("key", stub.url) as client:
+            validated = client.getAnnotations(3, labels=[projectkiwi3.models.LabelRecord(**label.model_dump())])
+            records = client.getAnnotations(3, trusted=True, labels=[label])
+
+    assert all(type(annotation.label) is projectkiwi3.models.Label and annotation.label == label for annotation in validated)
+    assert validated[0].label is validated[1].label
+    assert all(type(record.label) is projectkiwi3.models.LabelRecord and record.label.name == "known" for record in records)
+    assert records[0].toModel().label == label
+
+
+def test_upload_annotations_resumes():
+    """Failed chunks are reported, and resuming sends only those chunks
+    """
+    import json
+
+    state = {"failed": False, "received": []}
+    def multiple(body: bytes):
+        payload = json.loads(body)
+        if payload[0]["labelId"] == 40 and not state["failed"]:
+            state["failed"] = True
+            return 500, {"error": "oops"}
+        state["received"] += [p["labelId"] for p in payload]
+        return 200, [annotationDict(p["labelId"], labelId=p["labelId"]) for p in payload]
+
+    payloads = [projectkiwi3.models.AnnotationPayload(coordinates=[[0, 0]], shape="Point", labelId=i, confidence=1.0) 
+                for i in range(95)]
+    with StubServer({"POST /api/project/3/annotations/multiple": multiple}) as stub:
+        with projectkiwi3.Client("key", stub.url) as client:
+            first = client.uploadAnnotations(3, payloads, chunk_size=20, max_workers=3)
+            assert not first.complete
+            assert first.succeededChunks == [0, 1, 3, 4]
+            assert list(first.failedChunks) == [2]
+            assert len(first.annotations) == 75
+
+            second = client.uploadAnnotations(3, payloads, max_workers=3, resume_token=first.resumeToken)
+            assert second.complete
+            assert second.succeededChunks == [2]
+            assert [a.id for a in second.annotations] == list(range(40, 60))
+
+            with pytest.raises(ValueError):
+                client.uploadAnnotations(3, payloads[:10], resume_token=first.resumeToken)
+
+    assert sorted(state["received"]) == list(range(95))
+
+
+def test_get_image_into_buffer():
+    """Images can be decoded into a preallocated batch, or returned still encoded
+    """
+    import base64
+    import numpy as np
+    from projectkiwi3 import chips
+
+    batch = np.full((2, 8, 8, 3), 255, dtype=np.uint8)
+    coords = [[7, 0], [7, 1], [8, 1], [7, 0]]
+    with StubServer(chipRoutes()) as stub:
+        with projectkiwi3.Client("key", stub.url, part_url=f"{stub.url}/get_part") as client:
+            result = client.getImageForTask(5, coords, out=batch[1])
+            encoded = client.getImageForTask(5, coords, encoded=True)
+            with pytest.raises(ValueError):
+                client.getImageForTask(5, coords, out=np.zeros((2, 2, 3), dtype=np.uint8))
+
+            # a buffer smaller than the body grows while reading
+            resp = client.session.get(f"{stub.url}/api/imagery/5/download_url", stream=True)
+            resp.headers.pop("Content-Length")
+            chips._buffers.buffer = None
+            assert bytes(chips.readBody(resp, chunk_size=4)) == b'"https://example.com/cog.tif"'
+
+    assert result is batch[1] or np.shares_memory(result, batch)
+    assert (batch[1, :4, :4] == 7).all() and (batch[1, 4:] == 0).all() and (batch[1, :, 4:] == 0).all()
+    assert (batch[0] == 255).all()
+    assert encoded.startswith(b"\x89PNG")
+
+
+def test_task_loader_batches():
+    """The loader batches prefetched images, skipping and recording failed tasks
+    """
+    import numpy as np
+
+    tasks = makeTasks(11)
+    with StubServer(chipRoutes(failOn=3)) as stub:
+        with projectkiwi3.Client("key", stub.url, part_url=f"{stub.url}/get_part", max_retries=0) as client:
+            loader = projectkiwi3.TaskLoader(client, 5, tasks, batch_size=4, prefetch=2, max_workers=2)
+            batches = list(loader)
+            stacked = list(projectkiwi3.TaskLoader(client, 5, tasks, batch_size=4, shape=(6, 6, 3), drop_last=True))
+
+            # stopping early shuts the background fetch down
+            for _ in projectkiwi3.TaskLoader(client, 5, makeTasks(100), batch_size=2, prefetch=4):
+                break
+
+    assert [[task.id for task in batchTasks] for _, batchTasks in batches] == [[0, 1, 2, 4], [5, 6, 7, 8], [9, 10]]
+    assert all((image == task.id).all() for images, batchTasks in batches for image, task in zip(images, batchTasks))
+    assert loader.stats.fetched == 10 and loader.stats.failed == 1 and loader.stats.batches == 3
+    assert [task.id for task, _ in loader.errors] == [3]
+    assert loader.snapshot().queueDepth == 0
+
+    assert len(stacked) == 2
+    images, batchTasks = stacked[1]
+    assert images.shape == (4, 6, 6, 3)
+    assert (images[:, :4, :4, 0] == np.array([task.id for task in batchTasks])[:, None, None]).all()
+    assert (images[:, 4:] == 0).all()
+
+
+def test_localhost_skips_verification_only_for_api_host():
+    """Against a local dev server, get_part on another host still verifies TLS
+    """
+    with StubServer(chipRoutes()) as stub:
+        local = stub.url.replace("127.0.0.1", "localhost")
+        with projectkiwi3.Client("key", local, part_url=f"{stub.url}/get_part") as client:
+            verify = {}
+            for session in (client.session, client.writeSession):
+                send = session.request
+                def request(method, url, send=send, **kwargs):
+                    verify[url.split("/")[-1]] = kwargs.get("verify", True)
+                    return send(method, url, **kwargs)
+                session.request = request
+            client.getImageForTask(5, [[7, 0], [7, 1], [8, 1], [7, 0]])
+            assert client.session.verify is True and client.writeSession.verify is True
+
+    assert verify == {"download_url": False, "get_part": True}
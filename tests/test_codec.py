@@ -0,0 +1,53 @@
+import json
+import pytest
+import projectkiwi3
+from projectkiwi3.codec import JsonCodec
+
+from tests.stubserver import StubServer
+from tests.test_client import annotationDict
+
+
+def test_compressed_requests_and_responses():
+    annotations = [annotationDict(i) for i in range(200)]
+    received = []
+    def created(body: bytes):
+        received.extend(json.loads(body))
+        return 200, annotations
+
+    routes = {
+        "GET /api/project/3/annotations": lambda body: (200, annotations),
+        "POST /api/project/3/annotations/multiple": created,
+    }
+    payloads = [projectkiwi3.models.AnnotationPayload(coordinates=[[i, 0], [i, 1]], shape="Linestring", labelId=1, confidence=1.0) 
+                for i in range(200)]
+    with StubServer(routes, gzip_responses=True) as stub:
+        with projectkiwi3.Client("key", stub.url, compress_requests="gzip", compress_min_bytes=1024) as client:
+            assert len(client.getAnnotations(3)) == 200
+            assert len(list(client.iterAnnotations(3))) == 200
+            client.addAnnotations(3, payloads)
+            client.addAnnotations(3, payloads[:1]) # too small to compress
+        assert "gzip" in stub.headers["GET /api/project/3/annotations"]["Accept-Encoding"]
+        assert "Content-Encoding" not in stub.headers["POST /api/project/3/annotations/multiple"]
+
+    assert received == [p.toJSON() for p in payloads] + [payloads[0].toJSON()]
+    endpoints = client.metrics.snapshot()['endpoints']
+    # bytes are counted on the wire, after compression
+    assert endpoints["GET /api/project/{id}/annotations"]['responseBytes'] < len(json.dumps(annotations))
+    assert endpoints["POST /api/project/{id}/annotations/multiple"]['requestBytes'] < len(json.dumps(received))
+
+
+def test_custom_codec():
+    calls = []
+    def loads(body: bytes):
+        calls.append(len(body))
+        return json.loads(body)
+    codec = JsonCodec(loads, lambda obj: json.dumps(obj).encode())
+    with StubServer({"GET /api/project": lambda body: (200, [])}) as stub:
+        with projectkiwi3.Client("key", stub.url, json_codec=codec) as client:
+            assert client.getProjects() == []
+    assert calls == [2]
+
+
+def test_unsupported_compression():
+    with pytest.raises(ValueError):
+        projectkiwi3.Client("key", compress_requests="lz4")
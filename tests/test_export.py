@@ -0,0 +1,43 @@
+import os
+import json
+import projectkiwi3
+from projectkiwi3 import exportQueue, readShard, AnnotationIndex, AnnotationTable
+
+from tests.stubserver import StubServer
+from tests.test_client import chipRoutes, makeTasks, annotationDict
+
+
+def test_export_resumes(tmp_path):
+    """Shards contain each task's image and annotations in pixels, and a re-run only redoes failed or changed shards
+    """
+    tasks = makeTasks(7)
+    index = AnnotationIndex(AnnotationTable.from_json([annotationDict(2)]))
+    directory = str(tmp_path)
+
+    with StubServer(chipRoutes(failOn=5)) as stub:
+        with projectkiwi3.Client("key", stub.url, part_url=f"{stub.url}/get_part", max_retries=0) as client:
+            result = exportQueue(client, 5, tasks, directory, annotations=index, shard_size=3, max_workers=2)
+            assert result["shards"]["shard-00001.tar"] == {"taskIds": [3, 4], "failed": [5]}
+            assert stub.calls["POST /get_part"] == 7
+
+            rerun = exportQueue(client, 5, tasks, directory, annotations=index, shard_size=3, max_workers=2)
+            assert stub.calls["POST /get_part"] == 10
+
+            # a changed queue redoes the shards whose tasks differ, not just those that failed
+            changed = tasks[:6] + makeTasks(8)[7:]
+            result = exportQueue(client, 5, changed, directory, annotations=index, shard_size=3, max_workers=2)
+            assert stub.calls["POST /get_part"] == 14
+            assert result["shards"]["shard-00002.tar"] == {"taskIds": [7], "failed": []}
+            rerun = exportQueue(client, 5, tasks, directory, annotations=index, shard_size=3, max_workers=2)
+
+    assert sorted(rerun["shards"]) == ["shard-00000.tar", "shard-00001.tar", "shard-00002.tar"]
+    with open(os.path.join(directory, "index.json")) as f:
+        assert json.load(f) == rerun
+
+    rows = list(readShard(os.path.join(directory, "shard-00000.tar")))
+    assert [id for id, _, _ in rows] == [0, 1, 2]
+    id, image, meta = rows[2]
+    assert (image == 2).all()
+    # the annotation covers the whole task, so spans the whole 4x4 image
+    assert meta["annotations"][0]["id"] == 2
+    assert meta["annotations"][0]["pixels"][:3] == [[0, 4], [0, 0], [4, 0]]
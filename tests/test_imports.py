@@ -0,0 +1,37 @@
+import sys
+import subprocess
+
+HEAVY = ("numpy", "PIL", "shapely")
+
+
+def importedModules(code: str) -> set:
+    """Top level packages imported by running code in a fresh interpreter, from python -X importtime
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+    return {line.split("|")[-1].strip().split(".")[0] for line in result.stderr.splitlines() if line.startswith("import time:")}
+
+
+def test_client_does_not_import_heavy_dependencies():
+    modules = importedModules("import projectkiwi3; projectkiwi3.Client('key'); projectkiwi3.AsyncClient; projectkiwi3.models.Label")
+    assert "projectkiwi3" in modules
+    assert not modules & set(HEAVY)
+
+
+def test_client_classes_are_exported():
+    """Importing the Client and AsyncClient submodules must not shadow the classes of the same name
+    """
+    code = ("from projectkiwi3 import AsyncClient, Client; import inspect; assert inspect.isclass(Client) and inspect.isclass(AsyncClient);"
+            "import projectkiwi3; projectkiwi3.AsyncClient; projectkiwi3.Client('key')")
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_heavy_dependencies_load_on_first_use():
+    modules = importedModules("import projectkiwi3; projectkiwi3.boxToLngLatPolygon; projectkiwi3.AnnotationIndex")
+    assert {"numpy", "shapely"} <= modules
+
+
+def test_lazy_exports():
+    import projectkiwi3
+    from projectkiwi3.table import AnnotationTable
+    assert projectkiwi3.AnnotationTable is AnnotationTable
+    assert "ChipStore" in dir(projectkiwi3)
@@ -0,0 +1,69 @@
+import pytest
+import projectkiwi3
+from projectkiwi3.metrics import Metrics, MetricEvent, endpointName
+
+from tests.stubserver import StubServer
+from tests.test_client import flaky, annotationDict, chipRoutes, makeTasks
+
+
+def test_endpoint_name_groups_ids():
+    assert endpointName("GET", "https://projectkiwi.io/api/project/869/annotations?x=1") == "GET /api/project/{id}/annotations"
+    assert endpointName("POST", "http://127.0.0.1:8080/v3/get_part") == "POST /v3/get_part"
+
+
+def test_client_records_phases_and_retries():
+    events = []
+    routes = {
+        "GET /api/project": flaky(1, []),
+        "GET /api/project/3/annotations": lambda body: (200, [annotationDict(i, 1) for i in range(5)]),
+    }
+    with StubServer(routes) as stub:
+        with projectkiwi3.Client("key", stub.url, backoff_factor=0) as client:
+            client.metrics.addHook(events.append)
+            client.getProjects()
+            assert len(list(client.iterAnnotations(3))) == 5
+
+    endpoints = client.metrics.snapshot()['endpoints']
+    projects = endpoints["GET /api/project"]
+    assert projects['requests'] == 1 and projects['retries'] == 1 and projects['errors'] == 0
+    assert projects['responseBytes'] == 2
+    assert {"network", "parse", "build"} <= set(projects)
+    assert projects['network']['count'] == 1
+
+    annotations = endpoints["GET /api/project/{id}/annotations"]
+    assert annotations['responseBytes'] > 0 and annotations['parse']['count'] == 1
+    assert {event.phase for event in events} == {"network", "parse", "build"}
+
+
+def test_get_part_records_one_parse_per_request():
+    with StubServer(chipRoutes()) as stub:
+        with projectkiwi3.Client("key", stub.url, part_url=f"{stub.url}/get_part") as client:
+            for task in makeTasks(3):
+                client.getImageForTask(5, task.coordinates)
+            client.getImageForTask(5, task.coordinates, encoded=True)
+
+    getPart = client.metrics.snapshot()['endpoints']["POST /get_part"]
+    assert getPart['requests'] == 4 and getPart['parse']['count'] == 4
+
+
+def test_hook_errors_do_not_break_requests():
+    metrics = Metrics()
+    def hook(event: MetricEvent):
+        raise RuntimeError("broken hook")
+    metrics.addHook(hook)
+    with pytest.warns(UserWarning, match="broken hook"):
+        metrics.observe(MetricEvent("GET /api/project", "network", 0.02, status=200))
+    assert metrics.snapshot()['endpoints']["GET /api/project"]['requests'] == 1
+
+
+def test_prometheus_export():
+    metrics = Metrics()
+    metrics.observe(MetricEvent("GET /api/project", "network", 0.02, status=500, responseBytes=10))
+    metrics.observeCache("chip", True)
+    metrics.observeCache("chip", False)
+    text = metrics.toPrometheus()
+    assert 'projectkiwi3_request_seconds_bucket{endpoint="GET /api/project",phase="network",le="0.025"} 1' in text
+    assert 'projectkiwi3_request_seconds_bucket{endpoint="GET /api/project",phase="network",le="0.01"} 0' in text
+    assert 'projectkiwi3_request_errors_total{endpoint="GET /api/project"} 1' in text
+    assert 'projectkiwi3_cache_hits_total{cache="chip"} 1' in text
+    assert metrics.snapshot()['caches']['chip']['hitRatio'] == 0.5
@@ -0,0 +1,55 @@
+import projectkiwi3
+from projectkiwi3 import ProjectMirror
+
+from tests.stubserver import StubServer
+from tests.test_client import annotationDict
+
+
+def projectRoutes(state: dict):
+    project = {"id": 3, "name": "p", "createdAt": "2024", "modifiedAt": "2024", "owner": "me"}
+    label = {"id": 1, "name": "tree", "color": "rgb(0, 255, 0)", "active": True, "modifiedAt": "2024"}
+    queue = state.setdefault("queue", {"id": 9, "name": "q", "createdBy": "me", "modifiedAt": "2024", "labelingTasks": [
+        {"id": 1, "complete": False, "completedBy": None, "taskCoordinates": [{"lng": 0, "lat": 0}]}]})
+    return {
+        "GET /api/project/3": lambda body: (200, project),
+        "GET /api/project/3/labels": lambda body: (200, [label]),
+        "GET /api/project/3/annotations": lambda body: (200, state["annotations"]),
+        "GET /api/project/3/labelingQueue": lambda body: (200, [queue]),
+        "GET /api/project/3/imagery": lambda body: (200, []),
+    }
+
+
+def test_mirror_incremental_refresh(tmp_path):
+    state = {"annotations": [annotationDict(i) for i in range(20)]}
+    path = str(tmp_path / "mirror.sqlite")
+
+    with StubServer(projectRoutes(state)) as stub:
+        with projectkiwi3.Client("key", stub.url) as client:
+            with ProjectMirror(client, 3, path) as mirror:
+                counts = mirror.refresh()
+                assert counts["annotations"] == (20, 0)
+                assert mirror.getAnnotations() == client.getAnnotations(3)
+
+                # one edited, one deleted, one new
+                state["annotations"][0]["modifiedAt"] = "2025"
+                state["annotations"][0]["confidence"] = 0.9
+                del state["annotations"][5]
+                state["annotations"].append(annotationDict(100))
+                counts = mirror.refresh()
+                assert counts["annotations"] == (2, 1)
+                assert counts["labels"] == (0, 0)
+                assert mirror.getAnnotations() == client.getAnnotations(3)
+                assert mirror.refresh(max_age=3600) == {}
+
+                # completing a task doesn't change the queue's modifiedAt
+                state["queue"]["labelingTasks"][0]["complete"] = True
+                counts = mirror.refresh()
+                assert counts["labelingQueues"] == (1, 0) and counts["annotations"] == (0, 0)
+                assert mirror.getLabelingQueue(9).labelingTasks[0].complete
+
+    # reads are served from the file without a server
+    with ProjectMirror(None, 3, path) as mirror:
+        assert mirror.getProject().name == "p"
+        assert len(mirror.getAnnotationTable()) == 20
+        assert mirror.getLabelingQueue(9).labelingTasks[0].id == 1
+        assert [label.name for label in mirror.getLabels(trusted=True)] == ["tree"]
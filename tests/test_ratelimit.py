@@ -0,0 +1,108 @@
+import time
+import asyncio
+import threading
+
+import projectkiwi3
+from projectkiwi3.ratelimit import RateLimiter, retryAfter
+
+from tests.stubserver import StubServer
+from tests.test_client import chipRoutes, makeTasks
+
+
+def test_aimd_limit():
+    limiter = RateLimiter(max_concurrency=8, cooldown=10, default_backoff=0)
+    for _ in range(2):
+        limiter.acquire()
+    limiter.release(429)
+    limiter.release(503) # within the cooldown, not decreased again
+    assert limiter.snapshot()['limit'] == 4 and limiter.throttled == 2 and limiter.decreases == 1
+    for _ in range(40):
+        with limiter.slot() as report:
+            report(200)
+    assert limiter.snapshot()['limit'] == 8
+    assert limiter.inflight == 0
+
+
+def test_retry_after():
+    assert retryAfter("2") == 2.0
+    assert retryAfter(None) is None
+    assert 0 < retryAfter(time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))) <= 30
+
+
+def test_token_bucket_threads_and_asyncio():
+    limiter = RateLimiter(rate=100, burst=1)
+    start = time.monotonic()
+    threads = [threading.Thread(target=lambda: limiter.slot().__enter__()) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    async def main():
+        async def one():
+            async with limiter.slotAsync() as report:
+                report(200)
+        await asyncio.gather(*[one() for _ in range(5)])
+    asyncio.run(main())
+    assert time.monotonic() - start >= 0.08
+    assert limiter.requests == 10
+
+
+def test_client_backs_off_when_throttled():
+    """The server allows 2 requests in flight, the limiter adapts and every request succeeds
+    """
+    routes = chipRoutes()
+    getPart = routes["POST /get_part"]
+    state = {"inflight": 0, "throttled": 0}
+    lock = threading.Lock()
+    def throttledGetPart(body: bytes):
+        with lock:
+            state["inflight"] += 1
+            busy = state["inflight"] > 2
+            state["throttled"] += busy
+        try:
+            if busy:
+                return 429, {"error": "slow down"}, {"Retry-After": "0.02"}
+            time.sleep(0.01)
+            return getPart(body)
+        finally:
+            with lock:
+                state["inflight"] -= 1
+    routes["POST /get_part"] = throttledGetPart
+
+    limiter = RateLimiter(max_concurrency=8, cooldown=0.05)
+    with StubServer(routes) as stub:
+        with projectkiwi3.Client("key", stub.url, part_url=f"{stub.url}/get_part", max_retries=10, rate_limiter=limiter) as client:
+            results = list(client.getImagesForTasks(5, makeTasks(40), max_workers=8, return_exceptions=False))
+    assert [image[0, 0, 0] for _, image in results] == [task.coordinates[0][0] for task in makeTasks(40)]
+    assert limiter.throttled == state["throttled"] > 0
+    assert limiter.snapshot()['limit'] < 8
+
+
+def test_expired_url_refresh_releases_slot():
+    """Refreshing the download url after a 403 doesn't wait on the get_part request's own slot
+    """
+    import json
+
+    routes = chipRoutes()
+    urls = iter(["https://example.com/expired.tif", "https://example.com/fresh.tif"])
+    routes["GET /api/imagery/5/download_url"] = lambda body: (200, next(urls))
+    getPart = routes["POST /get_part"]
+    def signedGetPart(body: bytes):
+        if json.loads(body)["cog_url"].endswith("expired.tif"):
+            return 403, {"error": "expired"}
+        return getPart(body)
+    routes["POST /get_part"] = signedGetPart
+
+    limiter = RateLimiter(max_concurrency=1)
+    result = {}
+    with StubServer(routes) as stub:
+        with projectkiwi3.Client("key", stub.url, part_url=f"{stub.url}/get_part", rate_limiter=limiter) as client:
+            thread = threading.Thread(target=lambda: result.update(image=client.getImageForTask(5, [[3, 0], [4, 0], [4, 1], [3, 0]])), 
+                                      daemon=True)
+            thread.start()
+            thread.join(5)
+            assert not thread.is_alive(), limiter.snapshot()
+        assert stub.calls["POST /get_part"] == 2
+    assert result["image"][0, 0, 0] == 3
+    assert limiter.inflight == 0
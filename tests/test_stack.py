@@ -0,0 +1,52 @@
+import json
+import asyncio
+import numpy as np
+import pytest
+import requests
+
+import projectkiwi3
+
+from tests.stubserver import StubServer, encodeChip
+
+
+COORDS = [[0, 0], [1, 0], [1, 1], [0, 0]]
+
+
+def stackRoutes():
+    """Layer 5 is a 4x4 rgb image with a black border row, layer 6 an 8x8 rgba image with the left half transparent,
+    layer 7 fails
+    """
+    rgb = np.full((4, 4, 3), 50, dtype=np.uint8)
+    rgb[0] = 0
+    rgba = np.full((8, 8, 4), 100, dtype=np.uint8)
+    rgba[:, :4, 3] = 0
+    chips = {"cog5.tif": (200, encodeChip(rgb)), "cog6.tif": (200, encodeChip(rgba)), "cog7.tif": (500, {"error": "broken"})}
+    routes = {f"GET /api/imagery/{i}/download_url": (lambda i: lambda body: (200, f"cog{i}.tif"))(i) for i in (5, 6, 7)}
+    routes["POST /get_part"] = lambda body: chips[json.loads(body)["cog_url"]]
+    return routes
+
+
+def test_stack_layers_at_common_size():
+    with StubServer(stackRoutes()) as stub:
+        with projectkiwi3.Client("key", stub.url, part_url=f"{stub.url}/get_part", backoff_factor=0) as client:
+            stack = client.getImageStackForTask([5, 6], COORDS)
+            with pytest.raises(requests.HTTPError):
+                client.getImageStackForTask([5, 7], COORDS)
+            partial = client.getImageStackForTask([7, 5], COORDS, shape=(2, 2), allow_missing=True)
+
+    assert stack.images.shape == (2, 8, 8, 3) and stack.masks.shape == (2, 8, 8)
+    assert (stack.images[0, 3:] == 50).all() and not stack.masks[0, :2].any() and stack.masks[0, 2:].all()
+    assert (stack.images[1] == 100).all() and not stack.masks[1, :, :4].any() and stack.masks[1, :, 4:].all()
+
+    assert partial.images.shape == (2, 2, 2, 3) and list(partial.errors) == [7]
+    assert not partial.masks[0].any() and partial.masks[1, 1].all()
+
+
+def test_async_stack():
+    async def main(url: str):
+        async with projectkiwi3.AsyncClient("key", url, part_url=f"{url}/get_part") as client:
+            return await client.getImageStackForTask([6, 5], COORDS)
+
+    with StubServer(stackRoutes()) as stub:
+        stack = asyncio.run(main(stub.url))
+    assert stack.imageryIds == [6, 5] and stack.images.shape == (2, 8, 8, 3)
@@ -0,0 +1,43 @@
+import pickle
+import numpy as np
+import pytest
+from projectkiwi3 import ChipStore
+
+
+def test_append_and_read(tmp_path):
+    path = str(tmp_path / "chips")
+    with ChipStore(path, shape=(8, 8, 3), mode="a", grow_by=2) as writer:
+        reader = ChipStore(path)
+        assert len(reader) == 0
+
+        for taskId in range(5):
+            writer.append(100 + taskId, np.full((4 + taskId % 2, 8, 3), taskId, dtype=np.uint8))
+
+        # readers pick up new slots without a sync, including after the data file has grown
+        assert len(reader) == 5
+        assert 104 in reader and 99 not in reader
+        image = reader[103]
+        assert image.shape == (5, 8, 3) and (image == 3).all()
+        assert not image.flags.writeable
+
+        with pytest.raises(BlockingIOError):
+            ChipStore(path, mode="a")
+
+        with pytest.raises(ValueError):
+            writer.append(200, np.zeros((9, 8, 3), dtype=np.uint8))
+
+        with pytest.raises(ValueError):
+            writer.append(100, np.full((2, 2, 3), 9, dtype=np.uint8))
+        assert writer[100].shape == (4, 8, 3)
+        writer.sync()
+        reader.sync() # no-op when read only
+
+    # workers reopen the files rather than pickling the data
+    copy = pickle.loads(pickle.dumps(reader))
+    assert sorted(copy.ids()) == [100, 101, 102, 103, 104]
+    assert (copy[101] == 1).all()
+
+    with pytest.raises(KeyError):
+        copy[5]
+    with pytest.raises(PermissionError):
+        copy.append(5, image)
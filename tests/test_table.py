@@ -0,0 +1,63 @@
+import numpy as np
+import projectkiwi3
+from projectkiwi3 import AnnotationTable
+from projectkiwi3.models import Annotation
+
+from tests.test_client import annotationDict
+
+
+def makeTable():
+    data = [annotationDict(i, labelId=1 + i % 3) for i in range(10)]
+    data[4]["shape"] = "Point"
+    data[4]["coordinates"] = [{"lng": 4, "lat": 4}]
+    for i, dict in enumerate(data):
+        dict["confidence"] = i / 10
+    return data, AnnotationTable.from_json(data)
+
+
+def test_from_json_round_trip():
+    data, table = makeTable()
+    assert len(table) == 10
+    assert table.vertices.shape == (37, 2)
+    assert table.toAnnotations() == [Annotation.from_dict(dict) for dict in data]
+    assert AnnotationTable.from_annotations(table.toAnnotations()).toAnnotations() == table.toAnnotations()
+
+
+def test_rows_are_views():
+    _, table = makeTable()
+    row = table[2]
+    assert row.id == 2 and row.shape == "Polygon"
+    assert np.shares_memory(row.coordinates, table.vertices)
+    assert table[4].coordinates.tolist() == [[4, 4]]
+
+
+def test_filter():
+    data, table = makeTable()
+    filtered = table.filter(labelIds=[1, 2], minConfidence=0.2, shapes=["Polygon"])
+    expected = [Annotation.from_dict(dict) for dict in data 
+                if dict["labelId"] in [1, 2] and dict["confidence"] >= 0.2 and dict["shape"] == "Polygon"]
+    assert filtered.toAnnotations() == expected
+    assert table[::-1].toAnnotations() == [Annotation.from_dict(dict) for dict in data[::-1]]
+
+
+def test_annotation_index_matches_brute_force():
+    import shapely
+    from projectkiwi3 import AnnotationIndex
+
+    data, table = makeTable()
+    tasks = [[[x, -1], [x, 2], [x + 2.5, 2], [x + 2.5, -1], [x, -1]] for x in [0.5, 3.5, 100]]
+
+    index = AnnotationIndex(table)
+    many = index.query_many(tasks)
+    annotations = table.toAnnotations()
+    for task, rows in zip(tasks, many):
+        polygon = shapely.Polygon(task)
+        expected = [i for i, a in enumerate(annotations) 
+                    if polygon.intersects(shapely.Point(a.coordinates[0]) if a.shape == "Point" else shapely.Polygon(a.coordinates))]
+        assert rows.tolist() == expected
+        assert index.query(task).tolist() == expected
+
+    assert index.query(tasks[0], predicate="contains").tolist() == [1, 2]
+    filtered = AnnotationIndex(table, labelIds=[1])
+    assert set(filtered.table.labelIds.tolist()) == {1}
+    assert filtered.table.ids[filtered.query_many(tasks[:1])[0]].tolist() == [0, 3]
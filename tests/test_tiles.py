@@ -0,0 +1,61 @@
+import json
+import numpy as np
+
+import projectkiwi3
+from projectkiwi3.tiles import TileGrid
+from projectkiwi3.utils import boxesToLngLatPolygons
+
+from tests.stubserver import StubServer, encodeChip
+
+
+SQUARE = [[0, 0], [0.01, 0], [0.01, 0.01], [0, 0.01], [0, 0]]
+TRIANGLE = [[0, 0], [0.01, 0], [0, 0.01], [0, 0]]
+
+
+def tileRoutes(grid: TileGrid):
+    """get_part returns a max_size square filled with the tile's number, found from its first corner
+    """
+    numbers = {tuple(np.round(tile.coordinates[0], 9)): i + 1 for i, tile in enumerate(grid)}
+    def getPart(body: bytes):
+        request = json.loads(body)
+        corner = tuple(np.round(request["polygon"]["geometry"]["coordinates"][0][0], 9))
+        size = request["max_size"]
+        return 200, encodeChip(np.full((size, size, 3), numbers[corner], dtype=np.uint8))
+    return {
+        "GET /api/imagery/5/download_url": lambda body: (200, "https://example.com/cog.tif"),
+        "POST /get_part": getPart,
+    }
+
+
+def test_grid_covers_task_at_resolution():
+    grid = TileGrid(SQUARE, resolution=5, tile_size=64)
+    assert (grid.width, grid.height) == (223, 223) and (grid.rows, grid.cols) == (4, 4)
+    last = grid.tile(3, 3)
+    assert (last.x, last.y, last.width, last.height) == (192, 192, 31, 31)
+    # tiles share edges exactly, and the full transform agrees with each tile's
+    assert np.allclose(grid.tile(0, 1).coordinates[0], grid.tile(0, 0).coordinates[1])
+    assert np.allclose(grid.transform.pixelToLngLat([200, 210]), last.transform.pixelToLngLat([8, 18]))
+
+
+def test_large_image_is_stitched():
+    grid = TileGrid(SQUARE, resolution=5, tile_size=64)
+    with StubServer(tileRoutes(grid)) as stub:
+        with projectkiwi3.Client("key", stub.url, part_url=f"{stub.url}/get_part") as client:
+            image, transform = client.getLargeImageForTask(5, SQUARE, resolution=5, tile_size=64)
+    assert image.shape == (223, 223, 3)
+    for i, tile in enumerate(grid):
+        assert (image[tile.y:tile.y + tile.height, tile.x:tile.x + tile.width] == i + 1).all()
+    # a box over the whole image maps back to the task
+    polygon = boxesToLngLatPolygons([[0, 0, 223, 223]], 223, 223, transform=transform)[0]
+    assert np.allclose(polygon[[3, 2, 1, 0, 3]], SQUARE, atol=1e-9)
+
+
+def test_tiles_outside_task_are_skipped():
+    grid = TileGrid(TRIANGLE, resolution=5, tile_size=64)
+    with StubServer(tileRoutes(grid)) as stub:
+        with projectkiwi3.Client("key", stub.url, part_url=f"{stub.url}/get_part") as client:
+            tiles = list(client.iterTilesForTask(5, TRIANGLE, resolution=5, tile_size=64, ordered=True))
+        assert stub.calls["POST /get_part"] == len(tiles) == 10
+    assert [(tile.row, tile.col) for tile, _ in tiles] == [(r, c) for r in range(4) for c in range(4) if c <= r]
+    tile, image = tiles[-1] # bottom right, the diagonal edge of the task crosses it
+    assert image[0, -1, 0] == 0 and image[-1, 0, 0] == 16
@@ -0,0 +1,84 @@
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import projectkiwi3
+from projectkiwi3.ttl import TTLCache
+
+from tests.stubserver import StubServer
+from tests.test_client import chipRoutes
+
+
+PROJECT = {"id": 7, "name": "p", "createdAt": "2024", "modifiedAt": "2024", "owner": "me"}
+
+
+def test_concurrent_lookups_are_coalesced():
+    cache = TTLCache(ttl=60)
+    calls = []
+    release = threading.Event()
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    with ThreadPoolExecutor(8) as pool:
+        futures = [pool.submit(cache.get, "key", fetch) for _ in range(8)]
+        time.sleep(0.1)
+        release.set()
+        assert [f.result() for f in futures] == ["value"] * 8
+    assert len(calls) == 1 and cache.misses == 1 and cache.coalesced == 7
+    assert cache.get("key", fetch) == "value" and cache.hits == 1
+
+
+def test_entries_expire_and_errors_are_not_cached():
+    cache = TTLCache(ttl=0.05)
+    values = iter([ValueError("down"), 1, 2])
+    def fetch():
+        value = next(values)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    try:
+        cache.get("key", fetch)
+        assert False, "should have raised"
+    except ValueError:
+        pass
+    assert cache.get("key", fetch) == 1
+    assert cache.get("key", fetch) == 1
+    time.sleep(0.06)
+    assert cache.get("key", fetch) == 2
+    cache.invalidate("key", value=1) # already replaced
+    assert cache.get("key", fetch) == 2
+
+
+def test_client_caches_metadata_per_instance():
+    with StubServer({"GET /api/project/7": lambda body: (200, PROJECT)}) as stub:
+        with projectkiwi3.Client("key", stub.url) as client, projectkiwi3.Client("other", stub.url, cache_ttl=0) as uncached:
+            assert [client.getProject(7).id for _ in range(5)] == [7] * 5
+            assert stub.calls["GET /api/project/7"] == 1
+            uncached.getProject(7)
+            uncached.getProject(7)
+            assert stub.calls["GET /api/project/7"] == 3
+    assert client.metrics.snapshot()['caches']['metadata'] == {'hits': 4, 'misses': 1, 'hitRatio': 0.8}
+
+
+def test_expired_download_url_is_refreshed():
+    routes = chipRoutes()
+    urls = iter(["https://example.com/expired.tif", "https://example.com/fresh.tif"])
+    routes["GET /api/imagery/5/download_url"] = lambda body: (200, next(urls))
+    getPart = routes["POST /get_part"]
+    def signedGetPart(body: bytes):
+        if json.loads(body)["cog_url"].endswith("expired.tif"):
+            return 403, {"error": "expired"}
+        return getPart(body)
+    routes["POST /get_part"] = signedGetPart
+
+    with StubServer(routes) as stub:
+        with projectkiwi3.Client("key", stub.url, part_url=f"{stub.url}/get_part") as client:
+            image = client.getImageForTask(5, [[3, 0], [4, 0], [4, 1], [3, 0]])
+            assert image[0, 0, 0] == 3
+            client.getImageForTask(5, [[3, 0], [4, 0], [4, 1], [3, 0]])
+        assert stub.calls["GET /api/imagery/5/download_url"] == 2
+        assert stub.calls["POST /get_part"] == 3
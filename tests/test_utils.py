@@ -0,0 +1,69 @@
+import numpy as np
+from projectkiwi3 import utils
+
+
+TASK = [[-123.40, 56.70], [-123.40, 56.71], [-123.38, 56.71], [-123.38, 56.70], [-123.40, 56.70]]
+
+
+def referenceBox(box, w, h, taskCoordinates, padding_factor=None):
+    """Straightforward per-point conversion, with shapely padding as getImageForTask does it
+    """
+    import shapely
+    if padding_factor:
+        polygon = shapely.Polygon(taskCoordinates)
+        scaled = shapely.affinity.scale(polygon, xfact=1 + (2 * padding_factor), yfact=1 + (2 * padding_factor))
+        taskCoordinates = list(scaled.exterior.coords)
+    coords = np.array(taskCoordinates)
+    west, south = coords.min(axis=0)
+    east, north = coords.max(axis=0)
+    x1, y1, x2, y2 = box
+    points = [[x1 / w, y1 / h], [x2 / w, y1 / h], [x2 / w, y2 / h], [x1 / w, y2 / h], [x1 / w, y1 / h]]
+    return [[west + x * (east - west), north - y * (north - south)] for x, y in points]
+
+
+def test_boxes_match_reference():
+    rng = np.random.default_rng(0)
+    boxes = np.sort(rng.uniform(0, 512, size=(50, 4)).reshape(50, 2, 2), axis=1).transpose(0, 2, 1).reshape(50, 4)
+    for padding_factor in [None, 0.2]:
+        polygons = utils.boxesToLngLatPolygons(boxes, 512, 256, TASK, padding_factor)
+        assert polygons.shape == (50, 5, 2)
+        for box, polygon in zip(boxes, polygons):
+            expected = referenceBox(box, 512, 256, TASK, padding_factor)
+            assert np.allclose(polygon, expected, rtol=0, atol=1e-12)
+            assert np.allclose(utils.boxToLngLatPolygon(list(box), 512, 256, TASK, padding_factor), expected, rtol=0, atol=1e-12)
+
+
+def test_normalized_points():
+    points = [[0, 0], [1, 1], [0.5, 0.25]]
+    assert np.allclose(utils.normalizedPointsToLngLat(points, TASK), [[-123.40, 56.71], [-123.38, 56.70], [-123.39, 56.7075]])
+
+
+def test_pad_polygon_matches_shapely():
+    import shapely
+    from projectkiwi3.geo import padPolygon
+
+    scaled = shapely.affinity.scale(shapely.Polygon(TASK), xfact=1.4, yfact=1.4)
+    assert np.allclose(padPolygon(TASK, 0.2), list(scaled.exterior.coords))
+    assert np.allclose(padPolygon(TASK[:-1], 0.2), list(scaled.exterior.coords))
+
+
+def test_geotransform_round_trip():
+    from projectkiwi3 import TaskGeoTransform
+
+    rng = np.random.default_rng(1)
+    pixels = rng.uniform(0, 512, size=(100, 2))
+    for mercator in [False, True]:
+        transform = TaskGeoTransform(TASK, 512, 256, padding_factor=0.1, mercator=mercator)
+        lnglat = transform.pixelToLngLat(pixels)
+        assert np.allclose(transform.lngLatToPixel(lnglat), pixels)
+
+        west, south, east, north = transform.bounds
+        assert np.allclose(transform.pixelToLngLat([[0, 0], [512, 256]]), [[west, north], [east, south]])
+
+        resized = transform.withSize(1024, 512)
+        assert np.allclose(resized.pixelToLngLat(pixels * 2), lnglat)
+
+    # mercator only differs in latitude, in the middle of the image
+    linear = TaskGeoTransform(TASK, 512, 256).pixelToLngLat([256, 128])
+    mercator = TaskGeoTransform(TASK, 512, 256, mercator=True).pixelToLngLat([256, 128])
+    assert np.isclose(linear[0], mercator[0]) and not np.isclose(linear[1], mercator[1], rtol=0, atol=1e-9)